@@ -2,36 +2,55 @@
 import sys
 import os
 import time
+import multiprocessing as mp
+from tqdm import tqdm
 
 # Add src to path
 sys.path.append(os.getcwd())
 
 from src.utils.dataloder import DataLoader
 from src.utils.sql_parser import SQLParser
+from src.utils.sql_batch import init_worker_parser, worker_parser, normalize_sql
+
+
+def _validate(task):
+    """校验单条 SQL，返回 (index, error_msg)，成功时 error_msg 为 None。"""
+    i, sql = task
+    parser = worker_parser()
+    try:
+        # Test 1: Parse and Qualify
+        parser.parse_sql(sql)
+        
+        # Test 2: Extract Entities
+        parser.extract_entities(sql)
+        
+        # Test 3: Generate Report (Extract Relationships)
+        # parser.generate_report(sql) 
+        
+        return i, None
+    except Exception as e:
+        return i, str(e)
+
 
 def check_academic():
     db_name = "academic"
     dataset_name = "spider"
     
-    print(f"Loading data for DB: {db_name} from {dataset_name}...")
-    
-    loader = DataLoader(dataset_name)
+    loader = DataLoader(dataset_name, db_filter=db_name)
     data = loader.filter_data(db_id=db_name, fields=["question", "sql_query"])
     
     if not data:
         print("Data not found in 'spider', trying 'spider_dev'...")
         dataset_name = "spider_dev"
-        loader = DataLoader(dataset_name)
+        loader = DataLoader(dataset_name, db_filter=db_name)
         data = loader.filter_data(db_id=db_name, fields=["question", "sql_query"])
         
     if not data:
         print(f"Error: Database '{db_name}' not found in spider or spider_dev.")
         return
 
-    print(f"Found {len(data)} SQL queries. Initializing Parser...")
-    
     try:
-        parser = SQLParser("spider", db_name) # Always use "spider" for schema path if mapped correctly
+        SQLParser("spider", db_name) # Always use "spider" for schema path if mapped correctly
     except Exception as e:
         print(f"Failed to initialize parser: {e}")
         return
@@ -41,50 +60,53 @@ def check_academic():
     
     results = []
 
-    print("\nStarting Validation...\n")
-    
+    # 解析为 CPU 密集型且各条 SQL 相互独立，分发到进程池并行校验
+    # 逐条 print 会让终端 I/O 成为瓶颈，改为 tqdm 进度条，仅输出失败项
+    # 相同的 SQL (忽略空白差异) 只校验一次，结果回填到所有对应的条目
+    groups = {}
     for i, item in enumerate(data):
-        sql = item['sql_query']
-        question = item['question']
-        
-        try:
-            # Test 1: Parse and Qualify
-            expression = parser.parse_sql(sql)
-            
-            # Test 2: Extract Entities
-            entities = parser.extract_entities(sql)
-            
-            # Test 3: Generate Report (Extract Relationships)
-            # parser.generate_report(sql) 
-            
-            success_count += 1
-            print(f"[{i+1}/{len(data)}] PASS: {sql[:60]}...")
-            
-        except Exception as e:
-            fail_count += 1
-            error_msg = str(e)
-            print(f"[{i+1}/{len(data)}] FAIL: {sql}")
-            print(f"    Error: {error_msg}")
-            results.append({
-                "index": i,
-                "question": question,
-                "sql": sql,
-                "error": error_msg
-            })
+        groups.setdefault(normalize_sql(item['sql_query']), []).append(i)
+    tasks = [(indices[0], data[indices[0]]['sql_query']) for indices in groups.values()]
+    first_to_indices = {indices[0]: indices for indices in groups.values()}
+
+    with mp.Pool(processes=os.cpu_count(), initializer=init_worker_parser, initargs=("spider", db_name)) as pool:
+        pbar = tqdm(pool.imap_unordered(_validate, tasks, chunksize=32), total=len(tasks),
+                    unit="sql", desc=f"Validating {db_name}")
+        for first, error_msg in pbar:
+            indices = first_to_indices[first]
+            if error_msg is None:
+                success_count += len(indices)
+            else:
+                fail_count += len(indices)
+                for i in indices:
+                    sql = data[i]['sql_query']
+                    tqdm.write(f"[{i+1}/{len(data)}] FAIL: {sql}")
+                    tqdm.write(f"    Error: {error_msg}")
+                    results.append({
+                        "index": i,
+                        "question": data[i]['question'],
+                        "sql": sql,
+                        "error": error_msg
+                    })
+
+            pbar.set_postfix(ok=success_count, fail=fail_count, refresh=False)
+
+    # imap_unordered 的完成顺序不固定，按原始下标输出失败详情
+    results.sort(key=lambda res: res["index"])
 
-    print(f"\n{'='*30}")
-    print(f"Summary for '{db_name}'")
-    print(f"Total: {len(data)}")
-    print(f"Success: {success_count}")
-    print(f"Failed: {fail_count}")
-    print(f"{'='*30}")
+    # 汇总信息拼接后一次性输出
+    lines = [f"\n{'='*30}",
+             f"Summary for '{db_name}'",
+             f"Total: {len(data)}",
+             f"Success: {success_count}",
+             f"Failed: {fail_count}",
+             f"{'='*30}"]
     
     if fail_count > 0:
-        print("\nFailure Details:")
+        lines.append("\nFailure Details:")
         for res in results:
-            print(f"\nID: {res['index']}")
-            print(f"SQL: {res['sql']}")
-            print(f"Error: {res['error']}")
+            lines.append(f"\nID: {res['index']}\nSQL: {res['sql']}\nError: {res['error']}")
+    print("\n".join(lines))
 
 if __name__ == "__main__":
     check_academic()
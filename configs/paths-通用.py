@@ -1,10 +1,10 @@
 from pathlib import Path
 
-DEFAULT_DATA_ROOT = (Path(__file__).parent.parent / "data").resolve()
-# 项目所在根目录
-PROJECT_ROOT = (Path(__file__).parent.parent).resolve()
+# 项目所在根目录 (只 resolve 一次，其余路径在此基础上拼接)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+DEFAULT_DATA_ROOT = PROJECT_ROOT / "data"
 # 输出目录
-OUTPUT_ROOT = (Path(__file__).parent.parent / "output").resolve()
+OUTPUT_ROOT = PROJECT_ROOT / "output"
 
 TRAIN_BIRD = r"F:\train_bird\train_databases"
 
@@ -1,85 +1,107 @@
 
 import sys
 import os
+import multiprocessing as mp
+from tqdm import tqdm
 
 # Add src to path
 sys.path.append(os.getcwd())
 
 from src.utils.dataloder import DataLoader
 from src.utils.sql_parser import SQLParser
+from src.utils.sql_batch import init_worker_parser, worker_parser, normalize_sql
+
+
+def _analyze(sql):
+    """生成单条 SQL 的解析报告，返回 (ok, report_or_error)。"""
+    try:
+        return True, worker_parser().generate_report(sql)
+    except Exception as e:
+        return False, str(e)
+
 
 def generate_report():
     db_name = "academic"
     # Try spider first
     dataset_name = "spider"
     
-    print(f"Loading data for DB: {db_name} from {dataset_name}...")
-    
-    loader = DataLoader(dataset_name)
+    loader = DataLoader(dataset_name, db_filter=db_name)
     data = loader.filter_data(db_id=db_name, fields=["question", "sql_query"])
     
     if not data:
         print("Data not found in 'spider', trying 'spider_dev'...")
         dataset_name = "spider_dev"
-        loader = DataLoader(dataset_name)
+        loader = DataLoader(dataset_name, db_filter=db_name)
         data = loader.filter_data(db_id=db_name, fields=["question", "sql_query"])
         
     if not data:
         print(f"Error: Database '{db_name}' not found.")
         return
 
-    print(f"Found {len(data)} SQL queries. Initializing Parser...")
-    
     try:
-        parser = SQLParser("spider", db_name) 
+        SQLParser("spider", db_name) 
     except Exception as e:
         print(f"Failed to initialize parser: {e}")
         return
 
     output_file = "academic_detailed_report.txt"
-    print(f"Generating detailed report to {output_file} ...")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(f"Detailed Parsing Report for Database: {db_name}\n")
-        f.write(f"Total Queries: {len(data)}\n")
-        f.write("="*60 + "\n\n")
+    # 每条记录先拼接为一个字符串再一次性写入，减少逐行 write 的编码与系统调用开销
+    # 解析在进程池中并行执行，imap 保证结果按原始顺序返回
+    with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as f, \
+            mp.Pool(processes=os.cpu_count(), initializer=init_worker_parser, initargs=("spider", db_name)) as pool:
+        f.write(f"Detailed Parsing Report for Database: {db_name}\n"
+                f"Total Queries: {len(data)}\n"
+                + "=" * 60 + "\n\n")
         
-        for i, item in enumerate(data):
+        # 相同的 SQL (忽略空白差异) 只解析一次；
+        # imap 按首次出现的顺序返回结果，遇到新 SQL 时取下一个结果即可
+        keys = [normalize_sql(item['sql_query']) for item in data]
+        first_index = {}
+        for i, key in enumerate(keys):
+            first_index.setdefault(key, i)
+        analyses = pool.imap(_analyze, [data[i]['sql_query'] for i in first_index.values()], chunksize=32)
+        resolved = {}
+        ok_count = fail_count = 0
+
+        # 进度统一在一行 tqdm 中刷新，取代逐 10 条的 print
+        pbar = tqdm(data, unit="sql", desc=f"Reporting {db_name}")
+        for i, item in enumerate(pbar):
             sql = item['sql_query']
             question = item['question']
+            if keys[i] not in resolved:
+                resolved[keys[i]] = next(analyses)
+            ok, analysis = resolved[keys[i]]
             
-            header = f"No.{i+1}\nQuestion: {question}\nSQL: {sql}\n"
+            chunks = [f"No.{i+1}\nQuestion: {question}\nSQL: {sql}\n"]
             
-            # Print to console (progress)
-            if (i+1) % 10 == 0:
-                print(f"Processing {i+1}/{len(data)}...")
+            if ok:
+                ok_count += 1
+                chunks.append("-" * 20 + " Analysis " + "-" * 20 + "\n")
+                chunks.append(analysis + "\n")
+            else:
+                fail_count += 1
+                tqdm.write(f"[{i+1}/{len(data)}] FAIL: {analysis}")
+                chunks.append("-" * 20 + " ERROR " + "-" * 20 + "\n")
+                chunks.append(f"Parsing Failed: {analysis}\n")
+            chunks.append("-" * 50 + "\n\n")
             
-            f.write(header)
-            
-            try:
-                report = parser.generate_report(sql)
-                f.write("-" * 20 + " Analysis " + "-" * 20 + "\n")
-                f.write(report + "\n")
-                f.write("-" * 50 + "\n\n")
-            except Exception as e:
-                f.write("-" * 20 + " ERROR " + "-" * 20 + "\n")
-                f.write(f"Parsing Failed: {e}\n")
-                f.write("-" * 50 + "\n\n")
+            f.write("".join(chunks))
+            pbar.set_postfix(ok=ok_count, fail=fail_count, refresh=False)
 
-    print(f"\nDone! Report saved to {os.path.abspath(output_file)}")
-    
     # Print first 3 examples to console as preview
-    print("\n--- Preview (First 3 entries) ---")
+    preview = [f"\nDone! Report saved to {os.path.abspath(output_file)}\n",
+               "\n--- Preview (First 3 entries) ---\n"]
     with open(output_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-        # Find where the 4th entry starts to cut off
+        # Iterate lazily and stop at the 4th entry instead of reading the whole report
         count = 0
-        for line in lines:
+        for line in f:
             if line.startswith("No."):
                 count += 1
             if count > 3:
                 break
-            print(line, end="")
+            preview.append(line)
+    print("".join(preview), end="")
 
 if __name__ == "__main__":
     generate_report()
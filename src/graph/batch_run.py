@@ -1,6 +1,11 @@
 import os
+import json
 import time
 import logging
+import logging.handlers
+import multiprocessing as mp
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 import sys
@@ -12,24 +17,173 @@ if str(project_root) not in sys.path:
 
 # 引入你的新模块
 from pipeline import SchemaPipeline
+from core import DataProfiler
 from configs import paths
 
-# 配置日志
-logging.basicConfig(
-    filename="pipeline_batch_run.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    encoding='utf-8'
-)
+# 日志配置
+LOG_FILE = "pipeline_batch_run.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
 
-def process_dataset(dataset_name, dataset_root_path, skip_existing=False):
+@contextmanager
+def _queue_logging():
+    """
+    主进程与所有 worker 的日志先写入队列，再由唯一的 QueueListener 线程落盘，
+    避免多进程争用同一个日志文件。
+    :yield: 日志队列 (需传递给 worker 的 initializer)
+    """
+    log_queue = mp.Queue(-1)
+    file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+
+    root = logging.getLogger()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+    listener.start()
+    try:
+        yield log_queue
+    finally:
+        root.removeHandler(queue_handler)
+        listener.stop()
+        file_handler.close()
+
+
+class _StdoutToLog:
+    """
+    worker 进程的标准输出替身：把各组件零散的 print 按行转发到日志 (进而进入主进程的日志队列)，
+    避免与主进程的进度条在终端中交错。
+    """
+
+    def __init__(self, logger, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.logger.log(self.level, line)
+        return len(text)
+
+    def flush(self):
+        if self._buffer.strip():
+            self.logger.log(self.level, self._buffer)
+        self._buffer = ""
+
+
+# 每个 worker 进程内共享的组件，由 _init_worker 在进程启动时初始化一次
+_worker_profiler = None
+
+
+def _init_worker(log_queue):
+    """进程池 initializer：每个 worker 只构建一次可复用组件，之后处理的所有数据库共享。"""
+    global _worker_profiler
+    _worker_profiler = DataProfiler()
+
+    # worker 内的日志统一转发到主进程的日志队列
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
+    # 组件内部的 print (如 SQLiteHandler / DataProfiler 的警告) 同样转入日志，终端只保留主进程的进度条
+    sys.stdout = _StdoutToLog(logging.getLogger("worker.stdout"))
+
+
+def _collect_finished_dbs(output_dir):
+    """
+    一次性扫描输出目录，收集已生成 pkl 的数据库及其源库指纹。
+    结构: output_dir / db_name / db_name.pkl (+ db_name.meta.json)
+
+    :return: {db_name: fingerprint}，旧版本生成、没有指纹文件的库其值为 None
+    """
+    finished = {}
+    if not os.path.isdir(output_dir):
+        return finished
+
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            target = f"{entry.name}.pkl"
+            meta = f"{entry.name}.meta.json"
+            with os.scandir(entry.path) as files:
+                names = {f.name for f in files}
+            if target not in names:
+                continue
+
+            fingerprint = None
+            if meta in names:
+                try:
+                    with open(os.path.join(entry.path, meta), "r", encoding="utf-8") as f:
+                        fingerprint = json.load(f)
+                except (OSError, ValueError):
+                    # 指纹损坏时视为过期，交由 worker 重新构建
+                    fingerprint = {}
+            finished[entry.name] = fingerprint
+    return finished
+
+
+def _process_one_db(task):
+    """
+    处理单个数据库 (进程池 worker)。
+
+    :param task: (dataset_name, db_dir, recorded_fingerprint) 元组，
+                 recorded_fingerprint 为已有 pkl 记录的源库指纹 (没有则为 None)
+    :return: (status, db_name, message)，status 取值为 success / fail / skip / missing
+    """
+    dataset_name, db_dir, recorded_fingerprint = task
+    db_dir = Path(db_dir)
+    db_name = db_dir.name
+
+    # 寻找该目录下的 sqlite 文件，默认取第一个 (找到即停止扫描)
+    # scandir 直接使用目录项缓存的类型信息，无需逐个 stat
+    with os.scandir(db_dir) as entries:
+        sqlite_file = next((e.path for e in entries if e.name.endswith(".sqlite") and e.is_file()), None)
+
+    if sqlite_file is None:
+        return "missing", db_name, f"Skipping {db_name}: No .sqlite file found."
+
+    sqlite_path = Path(sqlite_file)
+
+    # 构建输出路径
+    # 结构: output / dataset / db_name / db_name.pkl
+    output_dir = paths.OUTPUT_ROOT / dataset_name / db_name
+    output_pkl = output_dir / f"{db_name}.pkl"
+
+    # 源库指纹未变化，说明已有的 pkl 仍然有效
+    if recorded_fingerprint is not None and recorded_fingerprint == SchemaPipeline.fingerprint(sqlite_path):
+        return "skip", db_name, f"Skipping {db_name}: Source database unchanged -> {output_pkl}"
+
+    # 执行 Pipeline
+    try:
+        # 确保输出目录存在
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # 这里的 SchemaPipeline 封装了所有细节：SQLite读取 -> 分析 -> 构建图 -> 保存
+        # 静默模式：关闭内部的表级 tqdm，进度信息写入日志，避免与主进程的进度条交错
+        pipeline = SchemaPipeline(str(sqlite_path), str(output_pkl), profiler=_worker_profiler, quiet=True)
+        pipeline.run()
+
+        return "success", db_name, f"Success: {db_name} -> {output_pkl}"
+
+    except Exception as e:
+        return "fail", db_name, f"Failed: {db_name}. Error: {str(e)}"
+
+
+def process_dataset(dataset_name, dataset_root_path, skip_existing=False, max_workers=None):
     """
     批量处理指定数据集下的所有数据库。
+    各数据库之间完全独立，通过进程池并行构建。
 
     :param dataset_name: 数据集名称 (e.g., 'bird', 'spider')，用于生成输出目录层级
     :param dataset_root_path: 数据集根目录 (包含各个数据库文件夹的目录)
-    :param skip_existing: 如果目标 pkl 文件已存在，是否跳过
+    :param skip_existing: 如果目标 pkl 文件已存在且源库指纹未变化，是否跳过。
+                          旧版本生成、没有指纹文件的 pkl 直接视为已完成
+    :param max_workers: 并行进程数，默认使用 CPU 核心数
     """
     root_dir = Path(dataset_root_path)
 
@@ -39,11 +193,14 @@ def process_dataset(dataset_name, dataset_root_path, skip_existing=False):
 
     # 1. 扫描所有子目录，寻找 .sqlite 文件
     # 假设结构: root / db_name / db_name.sqlite
-    db_dirs = [d for d in root_dir.iterdir() if d.is_dir()]
+    with os.scandir(root_dir) as entries:
+        db_dirs = [Path(e.path) for e in entries if e.is_dir()]
+    max_workers = max_workers or os.cpu_count()
 
     print(f"\n🚀 开始处理数据集: [{dataset_name}]")
     print(f"📂 扫描到 {len(db_dirs)} 个数据库文件夹")
     print(f"📂 输出根目录: {paths.OUTPUT_ROOT}")
+    print(f"⚙️ 并行进程数: {max_workers}")
 
     # 打印跳过模式状态
     if skip_existing:
@@ -53,55 +210,42 @@ def process_dataset(dataset_name, dataset_root_path, skip_existing=False):
     fail_count = 0
     skip_count = 0  # 新增统计
 
-    # 使用 tqdm 显示进度
-    pbar = tqdm(db_dirs, desc=f"Building Graphs ({dataset_name})", unit="db")
-
-    for db_dir in pbar:
-        db_name = db_dir.name
-
-        # 寻找该目录下的 sqlite 文件
-        sqlite_files = list(db_dir.glob("*.sqlite"))
-
-        if not sqlite_files:
-            logging.warning(f"Skipping {db_name}: No .sqlite file found.")
-            continue
-
-        # 默认取第一个 sqlite 文件
-        sqlite_path = sqlite_files[0]
-
-        # 2. 构建输出路径
-        # 结构: output / dataset / db_name / db_name.pkl
-        output_dir = paths.OUTPUT_ROOT / dataset_name / db_name
-        output_pkl = output_dir / f"{db_name}.pkl"
-
+    # 日志经队列汇总后由单个监听线程写入，避免多进程并发写同一个日志文件
+    with _queue_logging() as log_queue:
         # === 核心修改：检测存在则跳过 ===
-        if skip_existing and output_pkl.exists():
-            skip_count += 1
-            # 记录日志，并在进度条后缀显示状态，但不打印刷屏
-            logging.info(f"Skipping {db_name}: Output file already exists -> {output_pkl}")
-            pbar.set_postfix(status="Skipped", db=db_name)
-            continue
+        # 只扫描一次输出目录，而不是对每个数据库单独 stat 目标文件；
+        # 带指纹的库交给 worker 与源库比对，源库变化后自动重建
+        finished = _collect_finished_dbs(paths.OUTPUT_ROOT / dataset_name) if skip_existing else {}
+        tasks = []
+        for d in db_dirs:
+            if d.name in finished and finished[d.name] is None:
+                skip_count += 1
+                logging.info(f"Skipping {d.name}: Output file already exists -> "
+                             f"{paths.OUTPUT_ROOT / dataset_name / d.name / f'{d.name}.pkl'}")
+                continue
+            tasks.append((dataset_name, str(d), finished.get(d.name)))
         # ============================
 
-        # 3. 执行 Pipeline
-        try:
-            # 确保输出目录存在
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # 更新进度条描述
-            pbar.set_postfix(status="Processing", db=db_name)
-
-            # 这里的 SchemaPipeline 封装了所有细节：SQLite读取 -> 分析 -> 构建图 -> 保存
-            pipeline = SchemaPipeline(str(sqlite_path), str(output_pkl))
-            pipeline.run()  # 内部已经包含了 tqdm (列级别)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(log_queue,)) as executor:
+            # 使用 tqdm 显示进度
+            pbar = tqdm(executor.map(_process_one_db, tasks), total=len(tasks),
+                        desc=f"Building Graphs ({dataset_name})", unit="db")
 
-            success_count += 1
-            logging.info(f"Success: {db_name} -> {output_pkl}")
+            for status, db_name, message in pbar:
+                if status == "success":
+                    success_count += 1
+                    logging.info(message)
+                elif status == "skip":
+                    skip_count += 1
+                    logging.info(message)
+                elif status == "missing":
+                    logging.warning(message)
+                else:
+                    fail_count += 1
+                    logging.error(message)
 
-        except Exception as e:
-            fail_count += 1
-            error_msg = f"Failed: {db_name}. Error: {str(e)}"
-            logging.error(error_msg)
+                pbar.set_postfix(status=status, db=db_name)
 
     print(f"\n✅ [{dataset_name}] 处理完成 Summary:")
     print(f"   - 成功: {success_count}")
@@ -119,7 +119,7 @@ class GraphRepoConverter:
                 
         # 3. Save to PKL
         with open(output_path, 'wb') as f:
-            pickle.dump(G, f)
+            pickle.dump(G, f, protocol=5)
 
 if __name__ == "__main__":
     # Default paths based on user request and environment
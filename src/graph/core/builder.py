@@ -136,8 +136,9 @@ class GraphBuilder:
         import os
         os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
 
+        # protocol 5: 比默认协议更紧凑，加载更快
         with open(output_path, 'wb') as f:
-            pickle.dump(self.G, f)
+            pickle.dump(self.G, f, protocol=5)
         print(f"Graph successfully saved to {output_path}")
 
     def get_graph(self):
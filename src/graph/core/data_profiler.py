@@ -92,15 +92,10 @@ class DataProfiler:
                 # 计算平均值
                 if valid_values:
                     try:
-                        if data_type in ["DECIMAL", "NUMERIC"]:
-                            # Decimal 转换处理
-                            attributes['numeric_mean'] = float(
-                                np.mean([float(Decimal(str(v))) for v in valid_values]))
-                        elif data_type == "BOOLEAN":
-                            attributes['numeric_mean'] = float(
-                                np.mean([int(v) for v in valid_values]))
-                        else:
-                            attributes['numeric_mean'] = float(np.mean(valid_values))
+                        # valid_values 只含 int/float (bool 为 int 子类)，一次性转为 float64 数组后在 C 层求均值；
+                        # 对这些值 float(Decimal(str(v))) 与 float(v) 完全相同，DECIMAL/BOOLEAN 无需逐个转换
+                        attributes['numeric_mean'] = float(
+                            np.fromiter(valid_values, dtype=np.float64, count=len(valid_values)).mean())
                     except Exception as e:
                         print(f"计算平均值时出错: {e}, 列名: {column_name}")
                         attributes['numeric_mean'] = None
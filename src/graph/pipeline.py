@@ -1,42 +1,60 @@
 import os
+import json
+import logging
 import pickle
 import networkx as nx
 from tqdm import tqdm
 from core import SQLiteHandler, DataProfiler, MetadataManager, GraphBuilder
 from configs import paths
 
+logger = logging.getLogger(__name__)
+
 
 class SchemaPipeline:
-    def __init__(self, database_path, output_path):
+    # 图构建逻辑的版本号：构建逻辑变化后递增，使已有的 pkl 指纹失效并重新生成
+    BUILDER_VERSION = "1.0"
+
+    def __init__(self, database_path, output_path, profiler=None, quiet=False):
         """
         初始化 Pipeline。
 
         :param database_path: SQLite 数据库源文件路径
         :param output_path: 结果图存储路径 (建议以 .pkl 结尾)
+        :param profiler: 可选的共享 DataProfiler 实例 (批量处理时复用，避免每个库重复初始化)
+        :param quiet: 静默模式 (批量并行处理时使用)：关闭表级 tqdm 进度条，进度信息改写入日志而非终端
         """
         self.database_path = database_path
         self.output_path = output_path
+        self.quiet = quiet
 
         # 初始化各个组件
         # 注意：SQLiteHandler 在 run() 中通过 with 上下文使用，此处不实例化连接
-        self.profiler = DataProfiler()
+        # DataProfiler 无状态，可在多个数据库之间安全复用
+        self.profiler = profiler or DataProfiler()
         self.metadata_manager = MetadataManager(database_path)
         self.builder = GraphBuilder()
 
+    def _report(self, message):
+        """输出进度信息：默认打印到终端，静默模式下写入日志"""
+        if self.quiet:
+            logger.info(message)
+        else:
+            print(message)
+
     def run(self):
         """
         执行 ETL 流程：提取 -> 分析 -> 构建图 -> 保存
         """
-        print(f"Starting schema extraction for: {self.database_path}")
+        self._report(f"Starting schema extraction for: {self.database_path}")
 
         # 1. 使用上下文管理器确保 SQLite 连接安全闭合
         with SQLiteHandler(self.database_path) as db:
 
             # --- 阶段 1: 处理表 (Table Nodes) ---
             tables = db.get_all_tables()
-            print(f"Found {len(tables)} tables.")
+            self._report(f"Found {len(tables)} tables.")
 
-            for table_name in tqdm(tables, desc="Processing Tables"):
+            for table_name in tqdm(tables, desc="Processing Tables", disable=self.quiet):
                 # 获取表级元数据
                 row_count = db.get_row_count(table_name)
                 pk_columns = db.get_primary_key_columns(table_name)
@@ -111,7 +129,7 @@ class SchemaPipeline:
 
             # --- 阶段 3: 处理外键关系 (Edges) ---
             # 必须在所有节点创建完后进行，否则引用计数可能不准确
-            print("Processing Foreign Keys...")
+            self._report("Processing Foreign Keys...")
             for table_name in tables:
                 fks = db.get_foreign_keys(table_name)
                 # fks 结构: (id, seq, table, from, to, ...)
@@ -134,9 +152,29 @@ class SchemaPipeline:
                             to_column=to_column
                         )
 
-        # 4. 保存图结构
+        # 4. 保存图结构，并在同级目录写入源数据库指纹，供增量构建判断是否过期
         self.builder.save_graph(self.output_path)
-        print(f"Pipeline completed. Schema graph saved to {self.output_path}")
+        with open(self.meta_path(self.output_path), "w", encoding="utf-8") as f:
+            json.dump(self.fingerprint(self.database_path), f)
+        self._report(f"Pipeline completed. Schema graph saved to {self.output_path}")
+
+    @classmethod
+    def fingerprint(cls, database_path):
+        """
+        计算源数据库指纹 (修改时间 + 文件大小 + 构建版本)。
+        指纹一致即认为已生成的图结构仍然有效，无需重新构建。
+        """
+        st = os.stat(database_path)
+        return {
+            "sqlite_mtime_ns": st.st_mtime_ns,
+            "sqlite_size": st.st_size,
+            "builder_version": cls.BUILDER_VERSION
+        }
+
+    @staticmethod
+    def meta_path(output_path):
+        """图结构文件对应的指纹文件路径: xxx.pkl -> xxx.meta.json"""
+        return os.path.splitext(output_path)[0] + ".meta.json"
 
     @staticmethod
     def load_graph(path):
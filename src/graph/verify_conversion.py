@@ -1,6 +1,7 @@
 import pickle
 import networkx as nx
 import os
+from itertools import islice
 
 def verify_graph(pkl_path):
     print(f"Verifying {pkl_path}...")
@@ -15,22 +16,14 @@ def verify_graph(pkl_path):
     print(f"Edges: {G.number_of_edges()}")
 
     print("\n--- Sample Nodes ---")
-    count = 0
-    for node, data in G.nodes(data=True):
+    for node, data in islice(G.nodes(data=True), 3):
         print(f"ID: {node}")
         print(f"Data: {data}")
-        count += 1
-        if count >= 3:
-            break
 
     print("\n--- Sample Edges ---")
-    count = 0
-    for u, v, data in G.edges(data=True):
+    for u, v, data in islice(G.edges(data=True), 3):
         print(f"{u} -> {v}")
         print(f"Data: {data}")
-        count += 1
-        if count >= 3:
-            break
             
     # Check specific nodes if possible (based on previous exploration)
     # phone_1: Table 'phone' and Column 'phone.Company_name'
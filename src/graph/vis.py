@@ -12,7 +12,7 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from configs import paths
-from src.utils.graph_loader import GraphLoader
+from src.utils.graph_loader import GraphLoader, CSR_SUFFIX
 
 # ==========================================
 # 0. 全局配置
@@ -57,7 +57,9 @@ STYLE = {
 def get_subdirs(path):
     if not os.path.exists(path):
         return []
-    return sorted([d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))])
+    # scandir 的目录项自带文件类型，无需对每个条目再 stat 一次
+    with os.scandir(path) as it:
+        return sorted(entry.name for entry in it if entry.is_dir())
 
 
 def smart_truncate(content, length=8):
@@ -99,13 +101,14 @@ def render_sidebar():
 
         selected_db = st.selectbox("数据库", databases)
 
-        # 自动查找 .pkl
-        db_path = os.path.join(dataset_path, selected_db)
-        if os.path.exists(db_path):
-            for file in os.listdir(db_path):
-                if file.endswith(".pkl"):
-                    selected_file = os.path.join(db_path, file)
-                    break
+        # 自动查找 .pkl: 优先约定路径 <db>/<db>.pkl，否则取目录下找到的第一个 .pkl (跳过 CSR 缓存文件)
+        db_path = Path(dataset_path) / selected_db
+        default_pkl = db_path / f"{selected_db}.pkl"
+        if default_pkl.is_file():
+            selected_file = str(default_pkl)
+        elif db_path.is_dir():
+            found = next((p for p in db_path.glob("*.pkl") if not p.name.endswith(CSR_SUFFIX)), None)
+            selected_file = str(found) if found else None
 
         if selected_file:
             st.caption(f"已加载: {os.path.basename(selected_file)}")
@@ -1,4 +1,4 @@
 from .clients import LLMClient
-from .prompt_manager import PromptManager
+from .prompt_manager import PromptManager, get_prompt_manager
 
-__all__ = ["LLMClient", "PromptManager"]
\ No newline at end of file
+__all__ = ["LLMClient", "PromptManager", "get_prompt_manager"]
\ No newline at end of file
@@ -1,9 +1,22 @@
 import os
+import json
+import asyncio
 import requests
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Any, Iterator
 from dotenv import load_dotenv
+from tenacity import Retrying, AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
 
 load_dotenv()
@@ -14,55 +27,185 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
+# 瞬时错误 (限流 / 5xx / 网络抖动) 的重试策略：指数退避，最多尝试 5 次
+RETRY_ATTEMPTS = 5
+RETRY_WAIT = wait_exponential(multiplier=1, min=1, max=30)
+
+
 # --- 1. 核心驱动层 (保持不变) ---
 class BaseDriver(ABC):
+    # 需要重试的瞬时异常类型，由子类在初始化时按各自 SDK 设置
+    retry_exceptions: tuple = ()
+
     @abstractmethod
     def request(self, messages: List[Dict], **kwargs) -> str: pass
 
+    async def arequest(self, messages: List[Dict], **kwargs) -> str:
+        """异步请求：默认在线程池中执行同步 request，子类可覆盖为原生异步实现"""
+        return await asyncio.to_thread(self.request, messages, **kwargs)
+
+    def request_stream(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        """流式请求：逐段产出文本；默认退化为一次性返回完整结果"""
+        yield self.request(messages, **kwargs)
+
+    def _is_retryable(self, exc: BaseException) -> bool:
+        """是否为需要重试的瞬时错误；默认按 retry_exceptions 判断，子类可补充按错误码判断的情况"""
+        return isinstance(exc, self.retry_exceptions)
+
+    def _retrying(self) -> Retrying:
+        return Retrying(wait=RETRY_WAIT, stop=stop_after_attempt(RETRY_ATTEMPTS),
+                        retry=retry_if_exception(self._is_retryable), reraise=True)
+
+    def _aretrying(self) -> AsyncRetrying:
+        return AsyncRetrying(wait=RETRY_WAIT, stop=stop_after_attempt(RETRY_ATTEMPTS),
+                             retry=retry_if_exception(self._is_retryable), reraise=True)
+
+    def _call_with_retry(self, fn, *args, **kwargs):
+        """对瞬时错误做指数退避重试，避免调用方整体重跑昂贵的提示词组装"""
+        for attempt in self._retrying():
+            with attempt:
+                return fn(*args, **kwargs)
+
+    async def _acall_with_retry(self, fn, *args, **kwargs):
+        async for attempt in self._aretrying():
+            with attempt:
+                return await fn(*args, **kwargs)
+
 
 class OpenAIDriver(BaseDriver):
     def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-4o"):
-        from openai import OpenAI
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        from openai import OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+        # 关闭 SDK 自带的重试，统一由 _call_with_retry 重试，避免两层重试叠加放大请求次数与等待时间
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.aclient = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = model
+        # APITimeoutError 是 APIConnectionError 的子类，一并覆盖
+        self.retry_exceptions = (RateLimitError, APIConnectionError, InternalServerError)
 
     def request(self, messages: List[Dict], **kwargs) -> str:
         params = {"model": self.model, "messages": messages, "temperature": 0, **kwargs}
-        response = self.client.chat.completions.create(**params)
+        response = self._call_with_retry(self.client.chat.completions.create, **params)
         return response.choices[0].message.content
 
+    async def arequest(self, messages: List[Dict], **kwargs) -> str:
+        params = {"model": self.model, "messages": messages, "temperature": 0, **kwargs}
+        response = await self._acall_with_retry(self.aclient.chat.completions.create, **params)
+        return response.choices[0].message.content
+
+    def request_stream(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        params = {"model": self.model, "messages": messages, "temperature": 0, **kwargs, "stream": True}
+        # 仅对建立连接阶段重试；开始产出内容后再失败则直接抛出，避免重复输出
+        response = self._call_with_retry(self.client.chat.completions.create, **params)
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
 
 class OllamaDriver(BaseDriver):
-    def __init__(self, base_url: str, model: str):
+    def __init__(self, base_url: str, model: str, timeout: float = 300):
         self.base_url = base_url.rstrip('/')
         self.model = model
+        self.timeout = timeout
+        # 复用 keep-alive 连接，避免每次请求重新建立 TCP 连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.retry_exceptions = (requests.ConnectionError, requests.Timeout)
+
+    JSON_HEADERS = {"Content-Type": "application/json"}
+
+    def _post(self, body: bytes, stream: bool = False) -> requests.Response:
+        response = self.session.post(f"{self.base_url}/api/chat", data=body, headers=self.JSON_HEADERS,
+                                     timeout=self.timeout, stream=stream)
+        response.raise_for_status()
+        return response
 
     def request(self, messages: List[Dict], **kwargs) -> str:
-        url = f"{self.base_url}/api/chat"
-        payload = {"model": self.model, "messages": messages, "stream": False, "options": kwargs}
+        # 请求体只序列化一次 (含数 KB 的 Schema 文本)，重试时直接复用
+        body = _dumps({"model": self.model, "messages": messages, "stream": False, "options": kwargs})
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
+            response = self._call_with_retry(self._post, body)
             return response.json().get("message", {}).get("content", "")
         except Exception as e:
             logger.error(f"Ollama Error: {e}")
             raise
 
+    def request_stream(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        body = _dumps({"model": self.model, "messages": messages, "stream": True, "options": kwargs})
+        try:
+            response = self._call_with_retry(self._post, body, stream=True)
+            # Ollama 流式响应为 NDJSON：每行一个片段，done=True 表示结束
+            with response:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama Error: {e}")
+            raise
+
 
 class GeminiDriver(BaseDriver):
     def __init__(self, api_key: str, model: str):
         from google import genai
+        from google.genai import errors
         self.client = genai.Client(api_key=api_key)
         self.model = model
+        self.retry_exceptions = (errors.ServerError,)
+        self._client_error = errors.ClientError
+
+    def _is_retryable(self, exc: BaseException) -> bool:
+        # 限流 (429) 以 ClientError 抛出，同样属于瞬时错误
+        return super()._is_retryable(exc) or (isinstance(exc, self._client_error) and exc.code == 429)
+
+    # OpenAI 风格角色 -> Gemini 角色，未列出的角色按 user 处理
+    ROLE_MAP = {"assistant": "model"}
+
+    @classmethod
+    def _convert_messages(cls, messages: List[Dict]):
+        """单次遍历完成转换：提取首条 system 消息作为 system_instruction，其余转为 Gemini contents"""
+        sys_instr = None
+        contents = []
+        for m in messages:
+            if m['role'] == 'system':
+                if sys_instr is None:
+                    sys_instr = m['content']
+                continue
+            contents.append({"role": cls.ROLE_MAP.get(m['role'], "user"), "parts": [{"text": m['content']}]})
+        return sys_instr, contents
 
     def request(self, messages: List[Dict], **kwargs) -> str:
-        sys_instr = next((m['content'] for m in messages if m['role'] == 'system'), None)
-        last_msg = messages[-1]['content']
-        response = self.client.models.generate_content(
-            model=self.model, contents=last_msg, config={"system_instruction": sys_instr, **kwargs}
+        sys_instr, contents = self._convert_messages(messages)
+        response = self._call_with_retry(
+            self.client.models.generate_content,
+            model=self.model, contents=contents, config={"system_instruction": sys_instr, **kwargs}
+        )
+        return response.text
+
+    async def arequest(self, messages: List[Dict], **kwargs) -> str:
+        sys_instr, contents = self._convert_messages(messages)
+        response = await self._acall_with_retry(
+            self.client.aio.models.generate_content,
+            model=self.model, contents=contents, config={"system_instruction": sys_instr, **kwargs}
         )
         return response.text
 
+    def request_stream(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        sys_instr, contents = self._convert_messages(messages)
+        response = self._call_with_retry(
+            self.client.models.generate_content_stream,
+            model=self.model, contents=contents, config={"system_instruction": sys_instr, **kwargs}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
 
 # --- 2. 统一调用入口 (集成了 PromptManager) ---
 
@@ -100,14 +243,14 @@ class LLMClient:
             raise ValueError(f"Unknown provider: {self.provider}")
 
         try:
-            from .prompt_manager import PromptManager
+            from .prompt_manager import get_prompt_manager
         except ImportError:
             # 如果相对导入失败（比如直接运行脚本时），尝试绝对导入
-            from src.llm.prompt_manager import PromptManager
+            from src.llm.prompt_manager import get_prompt_manager
 
-        # 2. 初始化 PromptManager
+        # 2. 初始化 PromptManager (同一 prompt_dir 在进程内共享一个实例)
         # 这样 LLMClient 就拥有了管理提示词的能力
-        self.prompter = PromptManager(prompt_dir=prompt_dir)
+        self.prompter = get_prompt_manager(prompt_dir)
 
     def ask(self, prompt: str, system: str = "You are a helpful assistant", **kwargs) -> str:
         """原生接口：直接传字符串"""
@@ -117,6 +260,42 @@ class LLMClient:
         ]
         return self.driver.request(messages, **kwargs)
 
+    def ask_stream(self, prompt: str, system: str = "You are a helpful assistant", **kwargs) -> Iterator[str]:
+        """流式接口：逐段产出模型输出，调用方可更早拿到首个 token"""
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        return self.driver.request_stream(messages, **kwargs)
+
+    async def aask(self, prompt: str, system: str = "You are a helpful assistant", **kwargs) -> str:
+        """原生接口的异步版本"""
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        return await self.driver.arequest(messages, **kwargs)
+
+    def ask_many(self, prompts: List[str], system: str = "You are a helpful assistant",
+                 max_concurrency: int = 8, **kwargs) -> List[str]:
+        """
+        批量接口：并发发送多个提示词，按输入顺序返回结果。
+        适用于批量生成等网络延迟主导的场景；不可在已运行的事件循环中调用 (请直接 await aask)。
+
+        :param prompts: 用户提示词列表
+        :param max_concurrency: 同时在途的最大请求数，避免触发供应商限流
+        """
+        async def _run() -> List[str]:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def _one(prompt: str) -> str:
+                async with semaphore:
+                    return await self.aask(prompt, system=system, **kwargs)
+
+            return await asyncio.gather(*(_one(p) for p in prompts))
+
+        return asyncio.run(_run())
+
     def ask_with_template(self, template_name: str, variables: Dict[str, Any] = {}, system_template: str = None,
                           **kwargs) -> str:
         """
@@ -1,10 +1,70 @@
 import os
+import json
 import yaml
-from typing import Dict, Any, Optional
+import string
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+_FORMATTER = string.Formatter()
+
+# 优先使用 libyaml 的 C 实现解析，未编译 libyaml 时回退到纯 Python 版本，输出一致
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=64)
+def _load_yaml_file(file_path: str, mtime_ns: int) -> Any:
+    """
+    解析单个 YAML 文件。以 (路径, 修改时间) 为键缓存，
+    多个 PromptManager 实例共享解析结果，文件被修改后自动失效。
+
+    解析结果另存为同目录下的 `<file>.json` 旁路缓存，JSON 解析远快于 YAML；
+    仅当缓存不早于 YAML 文件时才使用，缓存写入失败 (如只读部署) 不影响加载。
+    """
+    cache_path = file_path + ".json"
+    try:
+        if os.stat(cache_path).st_mtime_ns >= mtime_ns:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=_YAML_LOADER)
+
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    except (OSError, TypeError, ValueError):
+        # 含日期等非 JSON 类型，或目录不可写：放弃缓存，直接使用 YAML 结果
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+    return data
+
+
+def _compile_template(template: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """
+    将 str.format 模板预解析为 [(literal_text, field_name), ...]，渲染时无需再次解析模板。
+    含格式说明、转换符或属性/下标访问的模板返回 None，回退到 str.format。
+    """
+    segments = []
+    for literal, field, spec, conversion in _FORMATTER.parse(template):
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return None
+        segments.append((literal, field))
+    return segments
+
+
+def _default_prompt_dir() -> str:
+    """Default to configs/prompts relative to project root (this file is src/llm/prompt_manager.py)."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(current_dir))
+    return os.path.join(project_root, "configs", "prompts")
+
 
 class PromptManager:
     """
@@ -20,16 +80,11 @@ class PromptManager:
             prompt_dir: Directory containing prompt YAML files. 
                         If None, defaults to 'configs/prompts' relative to project root.
         """
-        if prompt_dir:
-            self.prompt_dir = prompt_dir
-        else:
-            # Default to configs/prompts relative to project root
-            # Assuming this file is in src/llm/prompt_manager.py
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(os.path.dirname(current_dir))
-            self.prompt_dir = os.path.join(project_root, "configs", "prompts")
+        self.prompt_dir = prompt_dir or _default_prompt_dir()
 
         self.prompts: Dict[str, Any] = {}
+        # 预编译的模板: prompt_name -> segments (None 表示回退到 str.format)
+        self._compiled: Dict[str, Optional[List[Tuple[str, Optional[str]]]]] = {}
         self._load_prompts()
 
     def _load_prompts(self):
@@ -42,11 +97,14 @@ class PromptManager:
             if filename.endswith(".yaml") or filename.endswith(".yml"):
                 file_path = os.path.join(self.prompt_dir, filename)
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = yaml.safe_load(f)
-                        if data:
-                            self.prompts.update(data)
-                            logger.info(f"Loaded prompts from {filename}")
+                    data = _load_yaml_file(file_path, os.stat(file_path).st_mtime_ns)
+                    if data:
+                        self.prompts.update(data)
+                        # 加载时即预编译字符串模板，get_prompt 只需字典查找 + join
+                        for name, template in data.items():
+                            if isinstance(template, str):
+                                self._compiled[name] = _compile_template(template)
+                        logger.info(f"Loaded prompts from {filename}")
                 except Exception as e:
                     logger.error(f"Failed to load prompt file {filename}: {e}")
 
@@ -72,8 +130,14 @@ class PromptManager:
         # If the prompt is a dictionary (e.g. system/user messages), handle differently if needed
         # For now, assuming simple string templates or handling simple string formatting
         if isinstance(prompt_template, str):
+            segments = self._compiled.get(prompt_name)
             try:
-                return prompt_template.format(**kwargs)
+                if segments is None:
+                    return prompt_template.format(**kwargs)
+                return "".join(
+                    literal if field is None else literal + format(kwargs[field], "")
+                    for literal, field in segments
+                )
             except KeyError as e:
                 logger.warning(f"Missing key for prompt format: {e}")
                 return prompt_template  # Return raw if formatting fails? Or raise?
@@ -83,4 +147,24 @@ class PromptManager:
     def reload(self):
         """Reload all prompts from disk."""
         self.prompts = {}
+        self._compiled = {}
         self._load_prompts()
+
+
+def get_prompt_manager(prompt_dir: str = None) -> PromptManager:
+    """
+    返回进程内共享的 PromptManager (按 prompt_dir 区分)，避免每次实例化都重新扫描目录。
+    prompt_dir 先解析为绝对路径 (None 解析为默认目录)，get_prompt_manager() 与 get_prompt_manager(None)
+    等不同写法共享同一实例。
+    共享实例可直接调用 reload() 刷新；如需丢弃实例本身，调用 get_prompt_manager.cache_clear()。
+    """
+    return _shared_prompt_manager(os.path.abspath(prompt_dir or _default_prompt_dir()))
+
+
+@lru_cache(maxsize=None)
+def _shared_prompt_manager(prompt_dir: str) -> PromptManager:
+    """按已解析的绝对路径缓存 PromptManager 实例"""
+    return PromptManager(prompt_dir=prompt_dir)
+
+
+get_prompt_manager.cache_clear = _shared_prompt_manager.cache_clear
@@ -1,7 +1,8 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import json
-import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -9,19 +10,52 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 添加项目根目录到 sys.path
-project_root = str(Path(__file__).resolve().parent.parent.parent)
-if project_root not in sys.path:
-    sys.path.append(project_root)
+# 直接作为脚本运行时才需要添加项目根目录到 sys.path (作为 src.* 包导入时根目录已可导入)
+if not __package__:
+    project_root = str(Path(__file__).resolve().parent.parent.parent)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
 
 # 导入项目模块
 from src.utils.graph_loader import GraphLoader
 from src.utils.schema_generator import SchemaGenerator
 from src.llm.clients import LLMClient
-from src.llm.prompt_manager import PromptManager
+from src.llm.prompt_manager import get_prompt_manager
 from configs.paths import OUTPUT_ROOT
 
 
+def _find_json_object(text: str, start: int = 0) -> Optional[str]:
+    """
+    从 start 处开始单次正向扫描，返回第一个 `{` 到与之匹配的 `}` 之间的子串。
+    跟踪字符串与转义字符，字符串内的括号不计入深度；未找到完整对象时返回 None。
+    """
+    begin = text.find("{", start)
+    if begin == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(begin, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[begin:i + 1]
+    return None
+
+
 class AnchorSelector:
     """
     锚点选择器 (Anchor Selector)
@@ -35,35 +69,38 @@ class AnchorSelector:
         :param model: 具体模型名称 (如 gpt-4o, deepseek-chat, gemini-2.0-flash)。
                       如果为 None，则使用 LLMClient 内部定义的默认值。
         """
-        self.prompt_manager = PromptManager()
+        # 复用进程内共享的 PromptManager，提示词文件只解析一次
+        self.prompt_manager = get_prompt_manager()
 
         # 初始化 LLM 客户端，透传参数
         self.llm_client = LLMClient(provider=provider, model=model)
 
         # 预加载 System Prompt
         self.system_prompt = self.prompt_manager.get_prompt("schema_selection_system")
+        # System 消息在所有请求间共享，只构建一次
+        self._system_message = {"role": "system", "content": self.system_prompt}
 
     def _extract_json(self, text: str) -> Dict:
         """从 LLM 响应中提取 JSON"""
         try:
             return json.loads(text)
         except:
-            # 尝试提取 Markdown 代码块
-            code_block = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-            if code_block:
-                return json.loads(code_block.group(1))
-
-            # 尝试提取最外层大括号
-            matches = re.search(r'(\{.*\})', text, re.DOTALL)
-            if matches:
-                return json.loads(matches.group(1))
+            # 优先定位 Markdown ```json 代码块，再从其后(或全文)单次扫描出第一个完整的 JSON 对象
+            fence = text.find("```json")
+            candidate = _find_json_object(text, fence + len("```json") if fence != -1 else 0)
+            if candidate is None and fence != -1:
+                candidate = _find_json_object(text)
+            if candidate is not None:
+                try:
+                    return json.loads(candidate)
+                except ValueError:
+                    pass
 
             # 如果都失败，记录错误但不要抛出异常中断流程，而是返回空结果
             logger.error(f"JSON extraction failed for text: {text[:100]}...")
             return {"selected_entity": [], "reasoning": {}, "decomposition_steps": []}
 
-    def select_anchors(self, db_schema_str: str, question: str) -> Dict:
-        """执行锚点选择的核心交互逻辑"""
+    def _build_messages(self, db_schema_str: str, question: str) -> List[Dict]:
         # 获取 User Prompt
         user_msg = self.prompt_manager.get_prompt(
             "schema_selection_user",
@@ -71,10 +108,11 @@ class AnchorSelector:
             question=question
         )
 
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": user_msg}
-        ]
+        return [self._system_message, {"role": "user", "content": user_msg}]
+
+    def select_anchors(self, db_schema_str: str, question: str) -> Dict:
+        """执行锚点选择的核心交互逻辑"""
+        messages = self._build_messages(db_schema_str, question)
 
         try:
             raw_response = self.llm_client.driver.request(messages)
@@ -83,6 +121,71 @@ class AnchorSelector:
             logger.error(f"Anchor Selection LLM error: {str(e)}")
             return {"selected_entity": [], "reasoning": {}, "decomposition_steps": []}
 
+    async def aselect_anchors(self, db_schema_str: str, question: str) -> Dict:
+        """select_anchors 的异步版本，使用驱动的原生异步请求"""
+        messages = self._build_messages(db_schema_str, question)
+
+        try:
+            raw_response = await self.llm_client.driver.arequest(messages)
+            return self._extract_json(raw_response)
+        except Exception as e:
+            logger.error(f"Anchor Selection LLM error: {str(e)}")
+            return {"selected_entity": [], "reasoning": {}, "decomposition_steps": []}
+
+    def select_anchors_batch(self, db_schema_str: str, questions: List[str]) -> List[Dict]:
+        """
+        同一数据库的多个问题合并为一次请求：Schema (提示词中占比最大) 只发送一次。
+        按输入顺序返回结果，模型遗漏的问题返回空结果。
+        """
+        numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, start=1))
+        user_msg = self.prompt_manager.get_prompt(
+            "schema_selection_batch_user",
+            db_schema=db_schema_str,
+            questions=numbered
+        )
+
+        messages = [self._system_message, {"role": "user", "content": user_msg}]
+
+        empty = {"selected_entity": [], "reasoning": {}, "decomposition_steps": []}
+        try:
+            raw_response = self.llm_client.driver.request(messages)
+            entries = self._extract_json(raw_response).get("results", [])
+        except Exception as e:
+            logger.error(f"Anchor Selection LLM error: {str(e)}")
+            entries = []
+
+        by_id = {}
+        for entry in entries:
+            if isinstance(entry, dict):
+                try:
+                    by_id[int(entry.pop("question_id"))] = entry
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return [by_id.get(i, dict(empty)) for i in range(1, len(questions) + 1)]
+
+
+@lru_cache(maxsize=128)
+def _load_schema_cached(pkl_path: str, mtime_ns: int) -> str:
+    """
+    加载图结构并生成 Schema 描述文本。以 (路径, 修改时间) 为键缓存，
+    同一数据库的重复提问无需再次反序列化 pickle；图文件重建后自动失效。
+    清空缓存: _load_schema_cached.cache_clear()
+    """
+    graph = GraphLoader.load_graph_cached(pkl_path)
+    if not graph:
+        raise ValueError("Graph loaded is empty")
+
+    return SchemaGenerator(graph).database_description
+
+
+def _resolve_graph_path(dataset_name: str, db_id: str) -> Path:
+    """定位 Schema Graph 文件: 优先 <dataset>/<db_id>/<db_id>.pkl，其次 <dataset>/<db_id>.pkl"""
+    base_repo = OUTPUT_ROOT / "schema_graph_repo" / dataset_name
+    pkl_path = base_repo / db_id / f"{db_id}.pkl"
+    if not pkl_path.exists():
+        pkl_path = base_repo / f"{db_id}.pkl"
+    return pkl_path
+
 
 def run_anchor_selection(
         dataset_name: str,
@@ -107,11 +210,7 @@ def run_anchor_selection(
     logger.info(f"Starting Anchor Selection for DB: '{db_id}' using {provider} ({model or 'default'})")
 
     # 1. 动态定位 Schema Graph 文件路径
-    base_repo = OUTPUT_ROOT / "schema_graph_repo" / dataset_name
-    pkl_path = base_repo / db_id / f"{db_id}.pkl"
-
-    if not pkl_path.exists():
-        pkl_path = base_repo / f"{db_id}.pkl"
+    pkl_path = _resolve_graph_path(dataset_name, db_id)
 
     if not pkl_path.exists():
         error_msg = f"Schema Graph file not found at: {pkl_path}"
@@ -119,15 +218,8 @@ def run_anchor_selection(
         return {"error": error_msg, "selected_entity": []}
 
     try:
-        # 2. 加载图结构并生成 Schema 描述
-        graph = GraphLoader.load_graph(str(pkl_path))
-        if not graph:
-            raise ValueError("Graph loaded is empty")
-
-        sg = SchemaGenerator(graph)
-        db_schema_str = "\n".join(
-            sg.generate_combined_description(table) for table in sg.tables
-        )
+        # 2. 加载图结构并生成 Schema 描述 (按文件修改时间缓存)
+        db_schema_str = _load_schema_cached(str(pkl_path), pkl_path.stat().st_mtime_ns)
 
         # 3. 初始化选择器 (传入 provider 和 model)
         selector = AnchorSelector(provider=provider, model=model)
@@ -143,6 +235,103 @@ def run_anchor_selection(
         return {"error": str(e), "selected_entity": []}
 
 
+async def run_anchor_selection_async(
+        dataset_name: str,
+        db_id: str,
+        question: str,
+        provider: str = "deepseek",
+        model: Optional[str] = None,
+        selector: Optional[AnchorSelector] = None
+) -> Dict:
+    """
+    run_anchor_selection 的异步版本。
+    :param selector: 可选，复用已有的 AnchorSelector (并发调用时共享同一个客户端)
+    """
+    pkl_path = _resolve_graph_path(dataset_name, db_id)
+    if not pkl_path.exists():
+        error_msg = f"Schema Graph file not found at: {pkl_path}"
+        logger.error(error_msg)
+        return {"error": error_msg, "selected_entity": []}
+
+    try:
+        # Schema 描述按文件缓存，同一 db_id 只在首次调用时同步构建一次
+        db_schema_str = _load_schema_cached(str(pkl_path), pkl_path.stat().st_mtime_ns)
+        selector = selector or AnchorSelector(provider=provider, model=model)
+        return await selector.aselect_anchors(db_schema_str, question)
+
+    except Exception as e:
+        logger.error(f"Fatal error in run_anchor_selection_async: {e}", exc_info=True)
+        return {"error": str(e), "selected_entity": []}
+
+
+def run_anchor_selection_many(
+        items: List[Tuple[str, str, str]],
+        provider: str = "deepseek",
+        model: Optional[str] = None,
+        concurrency: int = 16
+) -> List[Dict]:
+    """
+    并发执行多次锚点选择，按输入顺序返回结果。
+    LLM 调用以网络延迟为主，并发请求可将吞吐提升到供应商的限流上限；
+    不可在已运行的事件循环中调用 (请直接 await run_anchor_selection_async)。
+
+    :param items: (dataset_name, db_id, question) 元组列表
+    :param concurrency: 同时在途的最大请求数
+    """
+    selector = AnchorSelector(provider=provider, model=model)
+
+    async def _run() -> List[Dict]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(item: Tuple[str, str, str]) -> Dict:
+            async with semaphore:
+                return await run_anchor_selection_async(*item, selector=selector)
+
+        return await asyncio.gather(*(_one(item) for item in items))
+
+    return asyncio.run(_run())
+
+
+def run_anchor_selection_batch(
+        dataset_name: str,
+        db_id: str,
+        questions: List[str],
+        provider: str = "deepseek",
+        model: Optional[str] = None,
+        batch_size: int = 10
+) -> List[Dict]:
+    """
+    批量版本的 run_anchor_selection：同一数据库的问题每 batch_size 个合并为一次 LLM 请求，
+    Schema 描述只构建一次、每批只发送一次，并能更好地命中供应商的前缀缓存。
+
+    Returns:
+        List[Dict]: 与 questions 一一对应的结果列表
+    """
+    logger.info(f"Starting batch Anchor Selection for DB: '{db_id}' ({len(questions)} questions) "
+                f"using {provider} ({model or 'default'})")
+
+    pkl_path = _resolve_graph_path(dataset_name, db_id)
+    if not pkl_path.exists():
+        error_msg = f"Schema Graph file not found at: {pkl_path}"
+        logger.error(error_msg)
+        return [{"error": error_msg, "selected_entity": []} for _ in questions]
+
+    try:
+        db_schema_str = _load_schema_cached(str(pkl_path), pkl_path.stat().st_mtime_ns)
+        selector = AnchorSelector(provider=provider, model=model)
+
+        results = []
+        for start in range(0, len(questions), batch_size):
+            results.extend(selector.select_anchors_batch(db_schema_str, questions[start:start + batch_size]))
+
+        logger.info(f"Batch Anchor Selection completed for {len(results)} questions.")
+        return results
+
+    except Exception as e:
+        logger.error(f"Fatal error in run_anchor_selection_batch: {e}", exc_info=True)
+        return [{"error": str(e), "selected_entity": []} for _ in questions]
+
+
 # --- 测试调用示例 ---
 if __name__ == "__main__":
     # 模拟外部调用
@@ -1,6 +1,24 @@
+import gc
 import json
+import os
+import pickle
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import cached_property
 from typing import Optional, List, Dict
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 from configs.paths import (
     SPIDER_TRAIN_JSON,
     SPIDER_TRAIN_OTHER_JSON,
@@ -10,6 +28,77 @@ from configs.paths import (
 )
 
 
+@contextmanager
+def _gc_paused():
+    """
+    批量反序列化期间暂停分代 GC：结果为无环的 list/dict，
+    大量新建容器只会反复触发无效的 GC 扫描 (堆越大代价越高)。
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _load_json_file(file_path: str):
+    """读取并解析整个 JSON 文件：优先使用 orjson (C 实现)，未安装时回退到标准库。"""
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    with _gc_paused():
+        return _json_loads(raw)
+
+
+def _stream_filter(file_path: str, db_id: str):
+    """用 ijson 流式解析 JSON 数组，逐条产出 db_id 匹配的记录，内存中只保留匹配项 (需安装 ijson)"""
+    with open(file_path, "rb") as f:
+        for item in ijson.items(f, "item", use_float=True):
+            if item.get("db_id") == db_id:
+                yield item
+
+
+def _intern_short_values(data: List[Dict], max_length: int = 32) -> None:
+    """
+    原地驻留记录中的短字符串值 (如 db_id)：JSON 解析只复用键对象，重复的值仍各占一份内存。
+    驻留后相同值共享同一对象，比较时可直接按指针短路，写入 pickle 缓存时也只序列化一次。
+    """
+    intern = sys.intern
+    for item in data:
+        for key, value in item.items():
+            if type(value) is str and len(value) < max_length:
+                item[key] = intern(value)
+
+
+def _cache_is_fresh(cache_path: str, *sources: str) -> bool:
+    """缓存文件存在且修改时间不早于所有源文件 (只比较修改时间，不读取内容)"""
+    try:
+        return os.path.getmtime(cache_path) >= max(os.path.getmtime(p) for p in sources)
+    except OSError:
+        return False
+
+
+def _load_pickle_cache(cache_path: str, *sources: str):
+    """缓存的修改时间不早于所有源文件时读取并返回缓存内容，否则 (含缓存缺失/损坏) 返回 None"""
+    try:
+        if os.path.getmtime(cache_path) >= max(os.path.getmtime(p) for p in sources):
+            with open(cache_path, "rb") as f, _gc_paused():
+                return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    return None
+
+
+def _dump_pickle_cache(cache_path: str, data) -> None:
+    try:
+        with open(cache_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        # 缓存写入失败 (如只读目录) 不影响正常加载
+        pass
+
+
 class DataLoader:
     """
     科研级通用数据加载器
@@ -34,28 +123,98 @@ class DataLoader:
         "evidence": "evidence"  # BIRD 特有字段
     }
 
-    def __init__(self, dataset_name: str):
+    # 统一字段的后处理：SQL 清洗 (去掉分号和多余空格)
+    FIELD_POSTPROCESSORS = {
+        "sql_query": lambda v: v.strip().rstrip(';') if isinstance(v, str) else v,
+    }
+
+    def __init__(self, dataset_name: str, db_filter: Optional[str] = None):
         """
         初始化加载器
         :param dataset_name: 支持 spider, spider_dev, bird 等
+        :param db_filter: 可选，仅保留指定 db_id 的数据。
+                          无可用缓存时若安装了 ijson 则流式解析，只在内存中保留匹配的记录。
         """
+        self.db_filter = db_filter
+        # 流式筛选的结果按 db_id 缓存，同一个库重复筛选时不再重新解析文件
+        self._streamed_by_db: Dict[str, List[Dict]] = {}
+        # 仅记录数据来源，首次访问 data 时才解析文件
         if dataset_name == "spider":
-            self.data = self._merge_json_files(SPIDER_TRAIN_JSON, SPIDER_TRAIN_OTHER_JSON)
+            self._sources = (SPIDER_TRAIN_JSON, SPIDER_TRAIN_OTHER_JSON)
             self.dataset_name = "spider_full_train"
         elif dataset_name in self.DATASETS:
-            self.data = self._load_data(self.DATASETS[dataset_name])
+            self._sources = (self.DATASETS[dataset_name],)
             self.dataset_name = dataset_name
         else:
             raise ValueError(f"未知数据集: {dataset_name}，支持: {list(self.DATASETS.keys()) + ['spider']}")
 
+    @cached_property
+    def data(self) -> List[Dict]:
+        """数据集记录列表，首次访问时加载并缓存"""
+        if len(self._sources) == 2:
+            return self._merge_json_files(*self._sources)
+        return self._load_data(self._sources[0])
+
+    @cached_property
+    def _by_db(self) -> Dict[str, List[Dict]]:
+        """db_id -> 记录列表 的索引，按库筛选时无需线性扫描全部数据"""
+        return self._build_db_index(self.data)
+
+    def _has_fresh_cache(self) -> bool:
+        """数据源是否都有可用的 pickle 缓存 (合并缓存或各文件的缓存)，有则整体加载比流式解析更快"""
+        if len(self._sources) == 2 and _cache_is_fresh(f"{self._sources[0]}.merged.pkl", *self._sources):
+            return True
+        return all(_cache_is_fresh(f"{path}.pkl", path) for path in self._sources)
+
+    @staticmethod
+    def _build_db_index(data: List[Dict]) -> Dict[str, List[Dict]]:
+        """按 db_id 分组建立索引 (保持原始顺序)"""
+        by_db = defaultdict(list)
+        for item in data:
+            by_db[item.get("db_id")].append(item)
+        return dict(by_db)
+
     def _load_data(self, file_path: str) -> List[Dict]:
-        """从 JSON 文件读取数据"""
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        """
+        从 JSON 文件读取数据。
+        解析结果会以 pickle 形式缓存在 JSON 同级目录 ({file}.pkl)，
+        仅当缓存的修改时间不早于 JSON 时才复用，否则重新解析并刷新缓存。
+        指定了 db_filter 且缓存不可用时，优先用 ijson 流式解析 (不写缓存)。
+        """
+        cache_path = f"{file_path}.pkl"
+        cached = _load_pickle_cache(cache_path, file_path)
+        if cached is not None:
+            return self._apply_db_filter(cached)
+
+        if self.db_filter and ijson is not None:
+            return list(_stream_filter(file_path, self.db_filter))
+
+        data = _load_json_file(file_path)
+        _intern_short_values(data)
+        _dump_pickle_cache(cache_path, data)
+        return self._apply_db_filter(data)
+
+    def _apply_db_filter(self, data: List[Dict]) -> List[Dict]:
+        """按 db_filter 裁剪已完整加载的数据"""
+        if not self.db_filter:
+            return data
+        return [item for item in data if item.get("db_id") == self.db_filter]
 
     def _merge_json_files(self, path1: str, path2: str) -> List[Dict]:
-        """合并两个 JSON 文件"""
-        return self._load_data(path1) + self._load_data(path2)
+        """
+        合并两个 JSON 文件。
+        合并结果缓存为 {path1}.merged.pkl，修改时间不早于两个输入文件时直接读取，一次反序列化即可。
+        指定了 db_filter 时不写合并缓存 (此时各文件可能走 ijson 流式解析，得不到完整数据)。
+        """
+        merged_cache = f"{path1}.merged.pkl"
+        cached = _load_pickle_cache(merged_cache, path1, path2)
+        if cached is not None:
+            return self._apply_db_filter(cached)
+
+        merged = self._load_data(path1) + self._load_data(path2)
+        if not self.db_filter:
+            _dump_pickle_cache(merged_cache, merged)
+        return merged
 
     def filter_data(self, db_id: Optional[str] = None, fields: Optional[List[str]] = None, show_count: bool = False):
         """
@@ -65,45 +224,63 @@ class DataLoader:
         :param show_count: 是否打印处理后的条数
         """
         # 1. 基础数据库筛选
-        filtered = [item for item in self.data if item.get("db_id") == db_id] if db_id else self.data
+        if db_id and db_id in self._streamed_by_db:
+            filtered = self._streamed_by_db[db_id]
+        elif (db_id and self.db_filter is None and "data" not in self.__dict__ and ijson is not None
+              and not self._has_fresh_cache()):
+            # 全量数据尚未加载且没有可用缓存：流式筛选单个库，内存占用只与该库的记录数相关
+            filtered = [item for path in self._sources for item in _stream_filter(path, db_id)]
+            self._streamed_by_db[db_id] = filtered
+        else:
+            # 通过 db_id 索引直接定位
+            filtered = self._by_db.get(db_id, []) if db_id else self.data
 
-        processed_data = []
-        for item in filtered:
+        if not fields:
             # 如果没有指定 fields，则保留原始 item 的副本
-            if not fields:
-                processed_data.append(item.copy())
-                continue
-
+            processed_data = [item.copy() for item in filtered]
+        else:
             # 2. 字段映射与补齐逻辑
-            new_item = {}
-
-            # 建立一个临时映射，方便快速查找原始数据中有哪些统一后的字段
-            # 例如 { "sql_query": "SELECT...", "question": "What..." }
-            current_mapped_values = {self.COLUMN_MAPPING.get(k, k): v for k, v in item.items()}
-
-            for field in fields:
-                # 获取映射后的值
-                val = current_mapped_values.get(field)
-
-                # 核心处理：如果请求了 evidence 但原始数据没有（如 Spider），则补 None
-                if field == "evidence" and val is None:
-                    new_item["evidence"] = None
-                # 处理 SQL 清洗：去掉分号和多余空格
-                elif field == "sql_query" and isinstance(val, str):
-                    new_item["sql_query"] = val.strip().rstrip(';')
-                else:
-                    new_item[field] = val
-
-            processed_data.append(new_item)
+            # 字段 -> 原始数据中可能的键 (如 sql_query <- query / SQL)，只与 fields 有关，在循环外计算一次
+            field_specs = [self._field_spec(field) for field in fields]
+            processed_data = [self._project(item, field_specs) for item in filtered]
 
         if show_count:
             print(f"[{self.dataset_name}] 筛选/处理完成，共 {len(processed_data)} 条数据。")
 
         return processed_data
 
+    @classmethod
+    def _field_spec(cls, field: str) -> tuple:
+        """
+        预计算单个统一字段的提取方式: (field, sources, post)
+        sources: 映射到该字段的所有原始键 (未在映射表中出现的键映射到自身)
+        post: 该字段的后处理函数，无需处理时为 None
+        """
+        sources = [k for k, v in cls.COLUMN_MAPPING.items() if v == field]
+        if field not in cls.COLUMN_MAPPING:
+            sources.append(field)
+        return field, tuple(sources), cls.FIELD_POSTPROCESSORS.get(field)
+
+    @staticmethod
+    def _project(item: Dict, field_specs: List[tuple]) -> Dict:
+        """按预先计算的字段提取方式从单条记录中提取统一字段"""
+        new_item = {}
+        for field, sources, post in field_specs:
+            # 获取映射后的值；缺失的字段 (如 Spider 的 evidence) 补 None
+            if len(sources) == 1:
+                val = item.get(sources[0])
+            else:
+                val = None
+                for key in sources:
+                    if key in item:
+                        val = item[key]
+                        break
+            new_item[field] = post(val) if post is not None else val
+        return new_item
+
     def list_dbnames(self):
         """列出当前数据集中包含的所有数据库 ID"""
-        db_ids = sorted(list({item.get("db_id") for item in self.data if "db_id" in item}))
+        db_ids = sorted(db_id for db_id in self._by_db if db_id is not None)
         return db_ids
 
 
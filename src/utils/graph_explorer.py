@@ -1,141 +1,338 @@
 from ast import main
 import networkx as nx
+import numpy as np
 import logging
-from typing import List, Dict, Any, Set
+from enum import IntEnum
+from functools import cached_property
+from typing import List, Dict, Any, Iterable, Set, Tuple
 
 import configs.paths
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 
+
+class NodeType(IntEnum):
+    """Node `type` strings interned to the codes stored in GraphExplorer's uint8 arrays."""
+    UNKNOWN = 0
+    TABLE = 1
+    COLUMN = 2
+
+
+class EdgeType(IntEnum):
+    """Edge `type` strings interned to the codes stored in GraphExplorer's uint8 arrays."""
+    OTHER = 0
+    HAS_COLUMN = 1
+    FOREIGN_KEY = 2
+
+
+# Compare against plain .value ints: numpy converts IntEnum members through a slow path
+_NODE_TYPE_CODES = {"Table": NodeType.TABLE.value, "Column": NodeType.COLUMN.value}
+_EDGE_TYPE_CODES = {"HAS_COLUMN": EdgeType.HAS_COLUMN.value, "FOREIGN_KEY": EdgeType.FOREIGN_KEY.value}
+
+
+
+def _bfs_levels_csr(indptr, indices, is_table, starts, num_nodes):
+    """
+    Level-synchronous BFS over the undirected FK CSR, following Table neighbors only.
+    Returns (node ids in visit order, level of each), levels non-decreasing.
+    """
+    queue = np.empty(num_nodes, dtype=np.int32)
+    level = np.empty(num_nodes, dtype=np.int32)
+    visited = np.zeros(num_nodes, dtype=np.bool_)
+    tail = 0
+    for s in starts:
+        if not visited[s]:
+            visited[s] = True
+            queue[tail] = s
+            level[tail] = 0
+            tail += 1
+
+    head = 0
+    while head < tail:
+        u = queue[head]
+        next_level = level[head] + 1
+        head += 1
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if is_table[k] and not visited[v]:
+                visited[v] = True
+                queue[tail] = v
+                level[tail] = next_level
+                tail += 1
+    return queue[:tail], level[:tail]
+
+
+def _union_find_connected(indptr, indices, members, num_nodes):
+    """
+    Whether the distinct nodes in members form one component over the undirected FK CSR,
+    using only edges between members (union-find with path halving, stops once connected).
+    """
+    parent = np.full(num_nodes, -1, dtype=np.int32)
+    for m in members:
+        parent[m] = m
+    components = len(members)
+    if components <= 1:
+        return True
+    for u in members:
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if parent[v] < 0:
+                continue
+            ru = u
+            while parent[ru] != ru:
+                parent[ru] = parent[parent[ru]]
+                ru = parent[ru]
+            rv = v
+            while parent[rv] != rv:
+                parent[rv] = parent[parent[rv]]
+                rv = parent[rv]
+            if ru != rv:
+                parent[ru] = rv
+                components -= 1
+                if components == 1:
+                    return True
+    return False
+
+
+if njit is not None:
+    _bfs_levels_csr = njit(cache=True)(_bfs_levels_csr)
+    _union_find_connected = njit(cache=True)(_union_find_connected)
+
+# Direction-optimizing BFS switch (Beamer et al.): pull once frontier edges * alpha exceed unexplored edges
+BFS_PULL_ALPHA = 14
+
+
 class GraphExplorer:
     """
     NetworkX implementation of the graph explorer, replacing the old Neo4jExplorer.
     Operates on a NetworkX DiGraph loaded from a pickle file.
+
+    On construction the graph is also compiled into integer CSR (Compressed Sparse Row)
+    arrays, so the query methods scan contiguous numpy slices instead of chasing
+    NetworkX's dict-of-dicts. The graph is treated as read-only after construction.
     """
 
     def __init__(self, graph: nx.DiGraph):
         self.graph = graph
+        self._csr_built = False
+
+        # Node index and type codes are cheap and needed by most queries, so build them eagerly
+        node_items = list(graph.nodes(data=True))
+        self._node_ids = [node for node, _ in node_items]
+        self._node_data = [data for _, data in node_items]
+        self._index = {node: i for i, node in enumerate(self._node_ids)}
+        self._node_type = np.fromiter(
+            (_NODE_TYPE_CODES.get(data.get("type"), NodeType.UNKNOWN.value) for data in self._node_data),
+            dtype=np.uint8, count=len(node_items))
+
+    def _ensure_csr(self):
+        """
+        Build the edge CSR arrays on first use (one-shot callers such as SchemaGenerator never pay for it):
+        - _out_* / _in_*: outgoing / incoming edges (indptr, neighbor indices, edge type code)
+        - _fk_*: undirected FOREIGN_KEY adjacency (self-loops dropped), used by the traversals
+        Outgoing neighbor order follows the graph's adjacency (insertion) order.
+        """
+        if self._csr_built:
+            return
+        self._csr_built = True
+        graph = self.graph
+        index = self._index
+        n = len(self._node_ids)
+
+        # adjacency() yields the raw neighbor dicts, avoiding NetworkX's per-access view objects
+        adjacency = dict(graph.adjacency())
+        out_lists = [adjacency[node] for node in self._node_ids]
+        self._out_indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum([len(nbrs) for nbrs in out_lists], out=self._out_indptr[1:])
+        m = int(self._out_indptr[-1])
+        self._out_indices = np.fromiter((index[v] for nbrs in out_lists for v in nbrs), dtype=np.int32, count=m)
+        self._out_edata = [data for nbrs in out_lists for data in nbrs.values()]
+        self._out_etype = np.fromiter(
+            (_EDGE_TYPE_CODES.get(data.get("type"), EdgeType.OTHER.value) for data in self._out_edata),
+            dtype=np.uint8, count=m)
+
+        # Incoming CSR: the same edges regrouped by target (stable sort keeps source order)
+        out_src = np.repeat(np.arange(n, dtype=np.int32), np.diff(self._out_indptr))
+        order = np.argsort(self._out_indices, kind="stable")
+        self._in_indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self._out_indices, minlength=n), out=self._in_indptr[1:])
+        self._in_indices = out_src[order]
+        self._in_etype = self._out_etype[order]
+
+        # Undirected FK adjacency: u -> v and v -> u for every FOREIGN_KEY edge, deduplicated
+        fk_mask = (self._out_etype == EdgeType.FOREIGN_KEY.value) & (out_src != self._out_indices)
+        fk_neighbors = [dict() for _ in range(n)]
+        for u, v in zip(out_src[fk_mask].tolist(), self._out_indices[fk_mask].tolist()):
+            fk_neighbors[u][v] = None
+            fk_neighbors[v][u] = None
+        self._fk_indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum([len(nbrs) for nbrs in fk_neighbors], out=self._fk_indptr[1:])
+        self._fk_indices = np.fromiter(
+            (v for nbrs in fk_neighbors for v in nbrs), dtype=np.int32, count=int(self._fk_indptr[-1]))
+        # Whether each FK neighbor is a Table node (get_neighbor_tables only follows tables)
+        self._fk_is_table = self._node_type[self._fk_indices] == NodeType.TABLE.value
+        # Plain-list copies for the Python BFS loops (element access on lists beats numpy scalars)
+        self._fk_indptr_list = self._fk_indptr.tolist()
+        self._fk_indices_list = self._fk_indices.tolist()
+        self._table_ids = np.flatnonzero(self._node_type == NodeType.TABLE.value).tolist()
+        # Per-node Table neighbors over FOREIGN_KEY (either direction), so traversals skip the type filter
+        fk_table_indices = np.where(self._fk_is_table, self._fk_indices, -1).tolist()
+        indptr = self._fk_indptr_list
+        self._fk_table_adj = [[v for v in fk_table_indices[indptr[i]:indptr[i + 1]] if v >= 0] for i in range(n)]
+        self._fk_degree = [len(nbrs) for nbrs in self._fk_table_adj]
+
+    def to_csr_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Export the CSR arrays plus the string data schema extraction needs, as plain numpy arrays
+        (no object dtype, so loading them never rebuilds Python object graphs). Used by GraphLoader.load_csr.
+        """
+        self._ensure_csr()
+        table_data = [self._node_data[i] for i in self._table_ids]
+        table_columns = [data.get("columns") if isinstance(data.get("columns"), list) else [] for data in table_data]
+        table_columns_indptr = np.zeros(len(table_columns) + 1, dtype=np.int32)
+        np.cumsum([len(columns) for columns in table_columns], out=table_columns_indptr[1:])
+        fk_keys = ("from_table", "from_column", "to_table", "to_column")
+        return {
+            "node_ids": np.array(self._node_ids, dtype=str),
+            "node_type": self._node_type,
+            "out_indptr": self._out_indptr,
+            "out_indices": self._out_indices,
+            "out_etype": self._out_etype,
+            "in_indptr": self._in_indptr,
+            "in_indices": self._in_indices,
+            "in_etype": self._in_etype,
+            "table_names": np.array([data.get("name") for data in table_data], dtype=str),
+            "table_columns_indptr": table_columns_indptr,
+            "table_columns": np.array([c for columns in table_columns for c in columns], dtype=str),
+            "foreign_keys": np.array([[fk.get(k) for k in fk_keys] for fk in self._fk_edges],
+                                     dtype=str).reshape(-1, len(fk_keys)),
+        }
 
     def get_all_nodes(self) -> List[Dict[str, Any]]:
         """
         Get all nodes with their labels and properties.
         """
-        nodes = []
-        for node_id, data in self.graph.nodes(data=True):
-            # Simulate Neo4j structure: labels is a list
-            labels = [data.get("type", "Unknown")]
-            nodes.append({"labels": labels, "properties": data})
-        return nodes
+        # Simulate Neo4j structure: labels is a list
+        return [{"labels": [data.get("type", "Unknown")], "properties": data} for data in self._node_data]
 
     def get_all_relationships(self) -> List[Dict[str, Any]]:
         """
         Get all relationships (edges) with their type and properties.
         """
-        relationships = []
-        for u, v, data in self.graph.edges(data=True):
-            relationships.append({"type": data.get("type"), "properties": data})
-        return relationships
+        # _out_edata holds edge properties in graph.edges() order (grouped by source node)
+        self._ensure_csr()
+        return [{"type": data.get("type"), "properties": data} for data in self._out_edata]
+
+    @cached_property
+    def _column_ids(self) -> List[int]:
+        """Node ids of Column nodes, in node order."""
+        return np.flatnonzero(self._node_type == NodeType.COLUMN.value).tolist()
+
+    @cached_property
+    def _tables_dict(self) -> Dict[str, Any]:
+        """{table_name: properties}, built once on first use."""
+        node_data = self._node_data
+        return {node_data[i].get("name"): node_data[i]
+                for i in np.flatnonzero(self._node_type == NodeType.TABLE.value).tolist()}
+
+    @cached_property
+    def _columns_of_table(self) -> Dict[str, Dict[str, Any]]:
+        """
+        {table node: {column_name: properties}} from one pass over the HAS_COLUMN edges.
+        Walks the raw neighbor dicts rather than the CSR, so one-shot callers (SchemaGenerator) skip the CSR build.
+        """
+        index, node_data = self._index, self._node_data
+        is_column = (self._node_type == NodeType.COLUMN.value).tolist()
+        columns_of_table = {}
+        for node, nbrs in self.graph.adjacency():
+            columns = {}
+            for neighbor, edge_data in nbrs.items():
+                if edge_data.get("type") == "HAS_COLUMN":
+                    j = index[neighbor]
+                    if is_column[j]:
+                        # Use node properties as column info
+                        columns[node_data[j].get("name")] = node_data[j]
+            if columns:
+                columns_of_table[node] = columns
+        return columns_of_table
+
+    @cached_property
+    def _fk_edges(self) -> List[Dict[str, Any]]:
+        """Properties of every FOREIGN_KEY edge, in edge order."""
+        self._ensure_csr()
+        edge_data = self._out_edata
+        return [edge_data[k] for k in np.flatnonzero(self._out_etype == EdgeType.FOREIGN_KEY.value).tolist()]
 
     def get_all_tables(self) -> Dict[str, Any]:
         """
         Get all table nodes.
         Returns: Dict {table_name: properties}
         """
-        tables = {}
-        for node_id, data in self.graph.nodes(data=True):
-            if data.get("type") == "Table":
-                tables[data.get("name")] = data
-        return tables
+        return dict(self._tables_dict)
 
     def get_all_columns(self) -> List[Dict[str, Any]]:
         """
         Get all column nodes properties.
         """
-        columns = []
-        for node_id, data in self.graph.nodes(data=True):
-            if data.get("type") == "Column":
-                columns.append(data)
-        return columns
+        node_data = self._node_data
+        return [node_data[i] for i in self._column_ids]
 
     def get_all_foreign_keys(self) -> List[Dict[str, Any]]:
         """
         Get all foreign key edges properties.
         """
-        foreign_keys = []
-        for u, v, data in self.graph.edges(data=True):
-            if data.get("type") == "FOREIGN_KEY":
-                foreign_keys.append(data)
-        return foreign_keys
+        return list(self._fk_edges)
 
     def get_columns_for_table(self, table_name: str, max_retries=5, retry_delay=1) -> Dict[str, Any]:
         """
         Get columns for a specific table.
         Retries parameters are kept for API compatibility but are not needed for in-memory graph.
         """
-        columns = {}
-        if table_name in self.graph:
-            # Check outgoing edges for HAS_COLUMN
-            for neighbor in self.graph.successors(table_name):
-                edge_data = self.graph.get_edge_data(table_name, neighbor)
-                if edge_data and edge_data.get("type") == "HAS_COLUMN":
-                    node_data = self.graph.nodes[neighbor]
-                    if node_data.get("type") == "Column":
-                        # Use node properties as column info
-                        columns[node_data.get("name")] = node_data
-
-        if not columns:
-            # Just a warning, not necessarily an error (table might have no columns or not exist)
-            # But following original logic, it might print warning.
-            # Original code: print warning if not found.
-            pass
-            # logger.warning(f"No columns found for table '{table_name}'")
+        return dict(self._columns_of_table.get(table_name, {}))
 
-        return columns
+    def get_columns_for_tables(self, table_names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batched get_columns_for_table: {table_name: {column_name: properties}} for every requested table.
+        All tables are served from the single HAS_COLUMN pass behind _columns_of_table.
+        """
+        columns_of_table = self._columns_of_table
+        return {name: dict(columns_of_table.get(name, {})) for name in table_names}
 
     def get_neighbor_tables(self, table_name: str, n_hop: int) -> List[str]:
         """
         Get neighbor tables within n_hop distance via FOREIGN_KEY relationships.
         Treats FOREIGN_KEY as undirected.
         """
-        if table_name not in self.graph:
-            logger.warning(f"Table {table_name} not found in graph.")
+        start = self._index.get(table_name)
+        if start is None:
+            logger.warning("Table %s not found in graph.", table_name)
             return []
+        self._ensure_csr()
+        fk_table_adj = self._fk_table_adj
 
-        visited = {table_name}
-        current_layer = {table_name}
+        # visited is a byte-per-node array indexed by node id (no string hashing per check)
+        visited = bytearray(len(self._node_ids))
+        visited[start] = 1
+        current_layer = [start]
+        found = []
 
         for _ in range(n_hop):
-            next_layer = set()
+            next_layer = []
             for node in current_layer:
-                # Check outgoing FKs
-                for neighbor in self.graph.successors(node):
-                    if neighbor == node: continue
-                    edge_data = self.graph.get_edge_data(node, neighbor)
-                    if edge_data.get("type") == "FOREIGN_KEY":
-                        if self.graph.nodes[neighbor].get("type") == "Table":
-                            if neighbor not in visited:
-                                visited.add(neighbor)
-                                next_layer.add(neighbor)
-
-                # Check incoming FKs
-                for neighbor in self.graph.predecessors(node):
-                    if neighbor == node: continue
-                    edge_data = self.graph.get_edge_data(neighbor, node)
-                    if edge_data.get("type") == "FOREIGN_KEY":
-                        if self.graph.nodes[neighbor].get("type") == "Table":
-                            if neighbor not in visited:
-                                visited.add(neighbor)
-                                next_layer.add(neighbor)
-
+                for neighbor in fk_table_adj[node]:
+                    if not visited[neighbor]:
+                        visited[neighbor] = 1
+                        next_layer.append(neighbor)
+            found.extend(next_layer)
             current_layer = next_layer
 
-        neighbors = list(visited - {table_name})
-        if not neighbors:
-            pass
-            # logger.warning(f"No {n_hop}-hop neighbors found for {table_name}")
-
-        return neighbors
+        return [self._node_ids[i] for i in found]
 
     def is_subgraph_connected(self, selected_tables: List[str]) -> bool:
         """
@@ -144,43 +341,57 @@ class GraphExplorer:
         if not selected_tables:
             return False
 
-        sub_nodes = set(selected_tables)
-        visited = set()
-        queue = [selected_tables[0]]
+        start = self._index.get(selected_tables[0])
+        if start is None:
+            # The start node is not in the graph, so it is the only node that can be visited
+            return len(selected_tables) == 1
 
-        while queue:
-            curr = queue.pop(0)
-            if curr in visited:
-                continue
-            visited.add(curr)
-
-            if curr not in self.graph: continue
-
-            # Check neighbors that are in sub_nodes
-            # Outgoing
-            for neighbor in self.graph.successors(curr):
-                if neighbor in sub_nodes and neighbor not in visited:
-                    if self.graph[curr][neighbor].get("type") == "FOREIGN_KEY":
-                        queue.append(neighbor)
-
-            # Incoming
-            for neighbor in self.graph.predecessors(curr):
-                if neighbor in sub_nodes and neighbor not in visited:
-                    if self.graph[neighbor][curr].get("type") == "FOREIGN_KEY":
-                        queue.append(neighbor)
+        members = [self._index[t] for t in selected_tables if t in self._index]
+        if len(set(members)) != len(selected_tables):
+            # Missing or repeated tables can never all be reached
+            return False
 
-        return len(visited) == len(selected_tables)
+        self._ensure_csr()
+        if njit is not None:
+            # Compiled union-find kernel over the CSR arrays
+            return bool(_union_find_connected(
+                self._fk_indptr, self._fk_indices, np.array(members, dtype=np.int32), len(self._node_ids)))
+
+        # Union-find over the FK edges between selected tables; stops as soon as one component remains
+        fk_indptr, fk_indices = self._fk_indptr_list, self._fk_indices_list
+        parent = {m: m for m in members}
+        components = len(members)
+        if components == 1:
+            return True
+        for u in members:
+            for v in fk_indices[fk_indptr[u]:fk_indptr[u + 1]]:
+                if v not in parent:
+                    continue
+                ru = u
+                while parent[ru] != ru:
+                    parent[ru] = parent[parent[ru]]
+                    ru = parent[ru]
+                rv = v
+                while parent[rv] != rv:
+                    parent[rv] = parent[parent[rv]]
+                    rv = parent[rv]
+                if ru != rv:
+                    parent[ru] = rv
+                    components -= 1
+                    if components == 1:
+                        return True
+        return False
 
     def bfs_subgraph(self, selected_tables: List[str]) -> List[List[str]]:
         """
         Perform BFS starting from selected_tables.
         Returns layers of visited tables.
         """
-        all_tables = set(self.get_all_tables().keys())
+        all_tables = self._tables_dict
         invalid_tables = [t for t in selected_tables if t not in all_tables]
         if invalid_tables:
             # raise RuntimeError(f"[ERROR] Tables not found: {invalid_tables}")
-            logger.error(f"[ERROR] Tables not found: {invalid_tables}")
+            logger.error("[ERROR] Tables not found: %s", invalid_tables)
             # Original code raised string? "raise (f...)" -> Actually "raise (f...)" evaluates to raising a TypeError (exception class must be type).
             # Original code line 144: `raise (f"[ERROR] ...")` which is a bug in original code (raise "string").
             # I will fix it to raise RuntimeError or just log and return empty.
@@ -190,68 +401,93 @@ class GraphExplorer:
             logger.error("[ERROR] Selected subgraph is not connected.")
             return []
 
-        visited = set(selected_tables)
-        queue = [(t, 0) for t in selected_tables]
+        self._ensure_csr()
+        index, node_ids = self._index, self._node_ids
+        if njit is not None:
+            # Compiled kernel over the CSR arrays; split the (node, level) pairs into layers
+            starts = np.array([index[t] for t in selected_tables], dtype=np.int32)
+            order, level = _bfs_levels_csr(self._fk_indptr, self._fk_indices, self._fk_is_table, starts, len(node_ids))
+            layers = np.split(order, np.flatnonzero(np.diff(level)) + 1)
+            return [[node_ids[i] for i in layer.tolist()] for layer in layers]
+
+        fk_table_adj, fk_degree = self._fk_table_adj, self._fk_degree
+        frontier = [index[t] for t in selected_tables]
+        visited = bytearray(len(node_ids))
+        for i in frontier:
+            visited[i] = 1
+        unvisited = [i for i in self._table_ids if not visited[i]]
+        unexplored_edges = sum(fk_degree[i] for i in unvisited)
         result = []
 
-        # To handle level separation correctly (original logic appends list of tables for each level processed in batch)
-        # Original code logic:
-        # while queue:
-        #    level_size = len(queue)
-        #    level_tables = []
-        #    for _ in range(level_size): ...
-        #    result.append(level_tables)
-
-        while queue:
-            level_size = len(queue)
-            level_tables = []
-
-            for _ in range(level_size):
-                current_table, level = queue.pop(0)
-                level_tables.append(current_table)
-
-                # 1-hop neighbors
-                neighbors = self.get_neighbor_tables(current_table, 1)
-                for neighbor in neighbors:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        queue.append((neighbor, level + 1))
-
-            if level_tables:
-                result.append(level_tables)
-
-        unvisited_tables = all_tables - visited
-        if unvisited_tables:
-            logger.debug(f"[DEBUG] Unvisited tables: {unvisited_tables}")
+        # Level-synchronous BFS over node ids: each frontier becomes one layer of the result.
+        # Push (top-down) expands the frontier's edges; pull (bottom-up) lets each unvisited
+        # table look for any frontier neighbor, which is cheaper once the frontier is large.
+        while frontier:
+            result.append([node_ids[i] for i in frontier])
+            frontier_edges = sum(fk_degree[i] for i in frontier)
+
+            if frontier_edges * BFS_PULL_ALPHA > unexplored_edges:
+                in_frontier = bytearray(len(node_ids))
+                for i in frontier:
+                    in_frontier[i] = 1
+                next_frontier, still_unvisited = [], []
+                for u in unvisited:
+                    for neighbor in fk_table_adj[u]:
+                        if in_frontier[neighbor]:
+                            next_frontier.append(u)
+                            break
+                    else:
+                        still_unvisited.append(u)
+                for u in next_frontier:
+                    visited[u] = 1
+                unvisited = still_unvisited
+            else:
+                next_frontier = []
+                for current in frontier:
+                    for neighbor in fk_table_adj[current]:
+                        if not visited[neighbor]:
+                            visited[neighbor] = 1
+                            next_frontier.append(neighbor)
+                if next_frontier:
+                    unvisited = [u for u in unvisited if not visited[u]]
+
+            unexplored_edges -= sum(fk_degree[i] for i in next_frontier)
+            frontier = next_frontier
 
         return result
 
+    @cached_property
+    def _fk_paths(self) -> Dict[Tuple[str, str], List[str]]:
+        """{(source table, target table): [reference_path]} for every FOREIGN_KEY edge that has one."""
+        return {(u, v): [data["reference_path"]] for u, v, data in self.graph.edges(data=True)
+                if data.get("type") == "FOREIGN_KEY" and data.get("reference_path")}
+
     def get_foreign_keys_between_tables(self, table1: str, table2: str) -> List[str]:
         """
         Get reference paths for FKs between two tables.
         """
-        paths = []
-
-        # t1 -> t2
-        if self.graph.has_edge(table1, table2):
-            data = self.graph[table1][table2]
-            if data.get("type") == "FOREIGN_KEY":
-                if data.get("reference_path"):
-                    paths.append(data["reference_path"])
-
-        # t2 -> t1
-        if self.graph.has_edge(table2, table1):
-            data = self.graph[table2][table1]
-            if data.get("type") == "FOREIGN_KEY":
-                if data.get("reference_path"):
-                    paths.append(data["reference_path"])
+        fk_paths = self._fk_paths
+        # t1 -> t2, then t2 -> t1
+        return fk_paths.get((table1, table2), []) + fk_paths.get((table2, table1), [])
 
+    def get_foreign_keys_to_tables(self, table_name: str, tables: List[str]) -> List[str]:
+        """
+        Reference paths for FKs between table_name and each of tables, in order
+        (same as concatenating get_foreign_keys_between_tables(table_name, t) for t in tables).
+        """
+        fk_paths = self._fk_paths
+        paths = []
+        for table in tables:
+            paths += fk_paths.get((table_name, table), ())
+            paths += fk_paths.get((table, table_name), ())
         return paths
 
 
 if __name__ == "__main__":
     from src.utils.graph_loader import GraphLoader
 
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
     pkl_path = configs.paths.OUTPUT_ROOT / "schema_graph_repo" / "bird" / "books" / "books.pkl"
     G = GraphLoader.load_graph(pkl_path)
     # 全面的图探索
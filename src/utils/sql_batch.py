@@ -0,0 +1,24 @@
+"""
+批量处理 SQL 的公共工具：进程池 worker 共享的 SQLParser 与 SQL 去重键。
+check_academic.py 与 generate_academic_report.py 共用，保证两者的去重规则一致。
+"""
+from src.utils.sql_parser import SQLParser
+
+# 每个 worker 进程持有一个 SQLParser，由 init_worker_parser 初始化
+_parser = None
+
+
+def init_worker_parser(dataset_name, db_name):
+    """进程池 initializer：在 worker 进程内构建一次 SQLParser，之后处理的所有 SQL 共享。"""
+    global _parser
+    _parser = SQLParser(dataset_name, db_name)
+
+
+def worker_parser() -> SQLParser:
+    """返回当前 worker 进程的 SQLParser (需先由 init_worker_parser 初始化)。"""
+    return _parser
+
+
+def normalize_sql(sql):
+    """折叠空白字符，作为 SQL 去重的键。"""
+    return " ".join(sql.split())
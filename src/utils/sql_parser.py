@@ -2,18 +2,24 @@ import pickle
 import re
 import sys
 import os
+from collections import OrderedDict
 import networkx as nx
 import sqlglot
 from sqlglot.optimizer.qualify import qualify
+from sqlglot.schema import MappingSchema
 from sqlglot.errors import OptimizeError
 from sqlglot.expressions import Table, Column, Join, Where, Identifier, EQ, Star
 from typing import Dict, List, Tuple, Set, Any, Optional
 
-# 将项目根目录添加到 sys.path 以便导入 src
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 将项目根目录添加到 sys.path 以便导入 src (作为 src.* 包导入时根目录已可导入，无需处理)
+if not __package__:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.utils.graph_schema_extractor import GraphSchemaExtractor
 
+# 解析缓存容量：同一数据库下重复的 SQL 直接复用已校正的 AST 与实体结果
+PARSE_CACHE_SIZE = 4096
+
 
 class SQLParser:
     """
@@ -31,33 +37,67 @@ class SQLParser:
         self.dataset_name = dataset_name
         self.db_name = db_name
         
-        # 1. 加载 Schema
+        # 1. 加载 Schema 与外键信息 (一次加载图文件，结果为共享缓存对象，只读使用)
         self.extractor = GraphSchemaExtractor(dataset_name)
         # raw_schema 格式: {table_name: [col1, col2, ...]}
-        self.raw_schema = self.extractor.extract_schema(db_name)
+        self.raw_schema, self.foreign_keys = self.extractor.extract_all(db_name)
         
         # 2. 构建用于 sqlglot optimizer 的 schema 字典
-        # 格式: {table: {col: type}}
-        self.optimizer_schema = {}
-        # 辅助结构：用于不区分大小写的查找
-        self._table_map_lower = {} # lower -> original
-        self._col_map_lower = {}   # table_lower -> {col_lower: original_col}
-
-        for table, cols in self.raw_schema.items():
-            self.optimizer_schema[table] = {col: "text" for col in cols}  # 类型默认为 text
-            
-            t_lower = table.lower()
-            self._table_map_lower[t_lower] = table
-            self._col_map_lower[t_lower] = {c.lower(): c for c in cols}
+        # 格式: {table: {col: type}}，类型默认为 text
+        self.optimizer_schema = {table: dict.fromkeys(cols, "text") for table, cols in self.raw_schema.items()}
+        # 辅助结构：用于不区分大小写的查找 (与各查找处保持一致，统一使用 str.lower)
+        self._table_map_lower = {table.lower(): table for table in self.raw_schema}  # lower -> original
+        self._col_map_lower = {   # table_lower -> {col_lower: original_col}
+            table.lower(): {c.lower(): c for c in cols} for table, cols in self.raw_schema.items()
+        }
 
-        # 3. 加载外键信息
-        self.foreign_keys = self.extractor.extract_foreign_keys(db_name)
+        # qualify 收到 dict 时每次调用都会重新构建并规范化 MappingSchema，这里预先构建一次复用
+        # 不指定方言，与 qualify 默认的标识符规范化方式保持一致
+        self._mapping_schema = MappingSchema(self.optimizer_schema)
+
+        # 外键索引: (表, 列, 表, 列) 的小写四元组 -> 外键路径描述，正反两个方向都登记，JOIN 等值条件一次查找即可
+        self._fk_index: Dict[Tuple[str, str, str, str], List[str]] = {}
+        for fk in self.foreign_keys:
+            from_key = (fk['from_table'].lower(), fk['from_column'].lower())
+            to_key = (fk['to_table'].lower(), fk['to_column'].lower())
+            path_str = f"{fk['from_table']}.{fk['from_column']} -> {fk['to_table']}.{fk['to_column']}"
+            self._fk_index.setdefault(from_key + to_key, []).append(path_str)
+            self._fk_index.setdefault(to_key + from_key, []).append(path_str)
+
+        # 3. LRU 缓存: sql -> 校正后的表达式 / 实体字典
+        self._parse_cache: OrderedDict = OrderedDict()
+        self._entity_cache: OrderedDict = OrderedDict()
+        # id(表达式) -> (表达式, 表信息)；parse_sql 返回共享的缓存表达式，实体与关系提取可复用同一份表信息
+        self._table_info_cache: OrderedDict = OrderedDict()
+        # (id(子表达式), 别名映射) -> (子表达式, 还原别名后的 SQL)；ON / WHERE 子树来自共享的缓存表达式
+        self._resolved_sql_cache: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key):
+        """从 LRU 缓存中读取，命中时将其移动到队尾。"""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key, value) -> None:
+        """写入 LRU 缓存，超出容量时淘汰最久未使用的条目。"""
+        cache[key] = value
+        if len(cache) > PARSE_CACHE_SIZE:
+            cache.popitem(last=False)
 
     def parse_sql(self, sql: str) -> sqlglot.Expression:
         """
         解析 SQL 语句，并进行 Schema 校正（Qualify）。
         如果校正失败（通常是因为找不到列或表），会抛出异常。
+        结果按 SQL 文本缓存，返回的表达式为共享对象，调用方不应原地修改。
         """
+        key = sql.strip()
+        cached = self._cache_get(self._parse_cache, key)
+        if cached is not None:
+            return cached
+
         try:
             # 使用 sqlite 风格解析，它更宽容双引号作为字符串
             expression = sqlglot.parse_one(sql, read="sqlite")
@@ -66,7 +106,8 @@ class SQLParser:
             expression = self._fix_double_quotes(expression)
             
             # 使用 sqlglot 的 qualify 进行优化和校正
-            qualified_expression = qualify(expression, schema=self.optimizer_schema)
+            qualified_expression = qualify(expression, schema=self._mapping_schema)
+            self._cache_put(self._parse_cache, key, qualified_expression)
             return qualified_expression
         except OptimizeError as e:
             # 将 sqlglot 的优化错误转换为 ValueError，提供更友好的提示
@@ -106,6 +147,11 @@ class SQLParser:
         提取 SQL 中的实体信息，按表进行分组。
         并验证实体是否存在于 Schema 中，如果不存在则抛出 ValueError。
         """
+        key = sql.strip()
+        cached = self._cache_get(self._entity_cache, key)
+        if cached is not None:
+            return {k: list(v) for k, v in cached.items()}
+
         # 1. 解析 SQL (这一步如果 qualify 失败会直接报错)
         expression = self.parse_sql(sql)
         
@@ -122,8 +168,19 @@ class SQLParser:
         # 初始化结果字典
         # 使用真实表名作为 key
         table_columns = {real_name: set() for real_name in real_table_names.values()}
-        
-        for column in expression.find_all(Column):
+        # 别名 -> 该表的 {列名小写: 真实列名}，循环内免去逐列的表名小写化与二次查找
+        alias_to_col_map = {alias: self._col_map_lower[real_name.lower()] for alias, real_name in real_table_names.items()}
+
+        # 一次遍历 AST，同时收集列引用与独立的 Star (*) 节点 (忽略作为 Column 一部分的 Star，t.* 在列中处理)
+        columns = []
+        has_bare_star = False
+        for node in expression.walk():
+            if isinstance(node, Column):
+                columns.append(node)
+            elif isinstance(node, Star) and not isinstance(node.parent, Column):
+                has_bare_star = True
+
+        for column in columns:
             table_alias = column.table
             col_name = column.name
             
@@ -132,48 +189,33 @@ class SQLParser:
                 if table_alias and table_alias in real_table_names:
                     real_table = real_table_names[table_alias]
                     # 扩展为该表所有列
-                    all_cols = self.raw_schema.get(real_table, [])
-                    for c in all_cols:
-                        table_columns[real_table].add(c)
+                    table_columns[real_table].update(self.raw_schema.get(real_table, []))
                 continue
 
-            real_table = None
-            
-            if table_alias:
-                # 如果有表别名/表名限定
-                if table_alias in real_table_names:
-                     real_table = real_table_names[table_alias]
-                # 这里的 else 情况已经被 parse_sql/qualify 处理了，理论上不会出现未知 alias
-            
-            if real_table:
+            # 如果有表别名/表名限定 (未知 alias 的情况已经被 parse_sql/qualify 处理了，理论上不会出现)
+            col_map = alias_to_col_map.get(table_alias) if table_alias else None
+            if col_map is not None:
                 # 验证列名 (不区分大小写)
-                c_lower = col_name.lower()
-                t_lower = real_table.lower()
-                
                 # 注意：qualify 之后，列名通常已经是正确的，但为了保险再次检查
-                if c_lower not in self._col_map_lower[t_lower]:
-                     raise ValueError(f"Column not found in schema: {real_table}.{col_name}")
+                real_col = col_map.get(col_name.lower())
+                if real_col is None:
+                     raise ValueError(f"Column not found in schema: {real_table_names[table_alias]}.{col_name}")
                 
                 # 存储真实列名
-                real_col = self._col_map_lower[t_lower][c_lower]
-                table_columns[real_table].add(real_col)
+                table_columns[real_table_names[table_alias]].add(real_col)
 
         # 4. 处理独立的 Star (*) 节点 (SELECT *)
         # 如果 qualify 没有扩展 * (例如因大小写问题)，这里会捕获到
-        for star in expression.find_all(Star):
-            # 忽略作为 Column 一部分的 Star (t.* 已在上面处理)
-            if isinstance(star.parent, Column):
-                continue
-            
+        if has_bare_star:
             # 对于 SELECT *，我们将当前作用域内所有表的列都加进去
             # 简化处理：将所有已识别的表的所有列都加进去
             for r_table in real_table_names.values():
-                all_cols = self.raw_schema.get(r_table, [])
-                for c in all_cols:
-                    table_columns[r_table].add(c)
+                table_columns[r_table].update(self.raw_schema.get(r_table, []))
 
         # 转换为列表并排序
-        return {k: sorted(list(v)) for k, v in table_columns.items()}
+        entities = {k: sorted(list(v)) for k, v in table_columns.items()}
+        self._cache_put(self._entity_cache, key, entities)
+        return {k: list(v) for k, v in entities.items()}
 
     def generate_report(self, sql: str) -> str:
         """
@@ -275,9 +317,13 @@ class SQLParser:
 
     def _extract_table_info(self, expression: sqlglot.Expression) -> Tuple[Dict[str, str], Set[str]]:
         """
-        提取表信息。
+        提取表信息。按表达式对象缓存 (同时保存表达式本身，防止 id 被复用)，调用方不应修改返回值。
         :return: (alias_to_table_dict, set_of_table_names)
         """
+        entry = self._cache_get(self._table_info_cache, id(expression))
+        if entry is not None and entry[0] is expression:
+            return entry[1]
+
         alias_to_table = {}
         tables = set()
         
@@ -292,7 +338,8 @@ class SQLParser:
             # 始终记录 table_name 本身指向自己
             alias_to_table[table_name] = table_name
             tables.add(table_name)
-            
+
+        self._cache_put(self._table_info_cache, id(expression), (expression, (alias_to_table, tables)))
         return alias_to_table, tables
 
     def _extract_join_relationships(self, expression: sqlglot.Expression, alias_to_table: Dict[str, str]) -> List[Dict[str, Any]]:
@@ -302,12 +349,18 @@ class SQLParser:
         """
         joins = []
         seen_conditions = set()
+        # 结构相同的 ON 条件 (sqlglot 表达式按结构判等) 还原后必然相同，先按结构去重，跳过重复的复制与渲染
+        seen_expressions = set()
 
         for join in expression.find_all(Join):
             join_type = join.kind
             on_condition = join.args.get("on")
 
             if on_condition:
+                if on_condition in seen_expressions:
+                    continue
+                seen_expressions.add(on_condition)
+
                 on_condition_str = self._resolve_aliases_in_expression(on_condition, alias_to_table)
 
                 if on_condition_str in seen_conditions:
@@ -330,51 +383,32 @@ class SQLParser:
         分析连接条件是否命中外键。
         返回命中外键的描述列表。
         """
-        fk_paths = []
+        # 以 dict 作为有序集合去重，返回顺序与命中顺序一致
+        fk_paths = {}
         
-        # 查找表达式中的所有等值比较
-        comparisons = []
-        if isinstance(expression, EQ):
-            comparisons.append(expression)
-        else:
-            comparisons.extend(expression.find_all(EQ))
-            
-        for eq in comparisons:
-            left = eq.left
-            right = eq.right
-            
-            if isinstance(left, Column) and isinstance(right, Column):
+        # 按源码顺序深度优先查找等值比较；列 = 列 的比较不会再包含 EQ，命中后不再下探其子树
+        stack = [expression]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, EQ):
+                left = node.left
+                right = node.right
+                if not (isinstance(left, Column) and isinstance(right, Column)):
+                    stack.extend(reversed(list(node.iter_expressions())))
+                    continue
+
                 l_table = alias_to_table.get(left.table, left.table)
                 l_col = left.name
                 r_table = alias_to_table.get(right.table, right.table)
                 r_col = right.name
                 
-                # Check against FKs
-                for fk in self.foreign_keys:
-                    # Normalize to lowercase for comparison
-                    fk_from_table = fk['from_table'].lower()
-                    fk_from_col = fk['from_column'].lower()
-                    fk_to_table = fk['to_table'].lower()
-                    fk_to_col = fk['to_column'].lower()
-                    
-                    l_table_lower = str(l_table).lower()
-                    l_col_lower = str(l_col).lower()
-                    r_table_lower = str(r_table).lower()
-                    r_col_lower = str(r_col).lower()
-
-                    # Case 1: left matches from, right matches to
-                    match_forward = (l_table_lower == fk_from_table and l_col_lower == fk_from_col and 
-                                     r_table_lower == fk_to_table and r_col_lower == fk_to_col)
-                    
-                    # Case 2: left matches to, right matches from
-                    match_backward = (l_table_lower == fk_to_table and l_col_lower == fk_to_col and 
-                                      r_table_lower == fk_from_table and r_col_lower == fk_from_col)
-                    
-                    if match_forward or match_backward:
-                        path_str = f"{fk['from_table']}.{fk['from_column']} -> {fk['to_table']}.{fk['to_column']}"
-                        fk_paths.append(path_str)
-                        
-        return list(set(fk_paths))
+                # Check against FKs (normalized to lowercase; the index covers both directions)
+                key = (str(l_table).lower(), str(l_col).lower(), str(r_table).lower(), str(r_col).lower())
+                fk_paths.update(dict.fromkeys(self._fk_index.get(key, ())))
+            else:
+                stack.extend(reversed(list(node.iter_expressions())))
+
+        return list(fk_paths)
 
     def _extract_where_conditions(self, expression: sqlglot.Expression, alias_to_table: Dict[str, str]) -> List[str]:
         """
@@ -391,16 +425,32 @@ class SQLParser:
     def _resolve_aliases_in_expression(self, expression: sqlglot.Expression, alias_to_table: Dict[str, str]) -> str:
         """
         将表达式中的表别名替换为真实表名。
+        结果按 (表达式对象, 别名映射) 缓存；qualify 后的标识符均带引号，几乎总要改写，因此改写仍在副本上进行。
         """
+        key = (id(expression), frozenset(alias_to_table.items()))
+        entry = self._cache_get(self._resolved_sql_cache, key)
+        if entry is not None and entry[0] is expression:
+            return entry[1]
+
         expr_copy = expression.copy()
         for col in expr_copy.find_all(Column):
+            table_id = col.args.get("table")
             if col.table and col.table in alias_to_table:
-                col.set("table", Identifier(this=alias_to_table[col.table], quoted=False))
+                if isinstance(table_id, Identifier):
+                    # 直接修改副本上的标识符，无需新建 Identifier
+                    table_id.set("this", alias_to_table[col.table])
+                    table_id.set("quoted", False)
+                else:
+                    col.set("table", Identifier(this=alias_to_table[col.table], quoted=False))
             # 同时也确保列名不带引号
-            col.set("this", Identifier(this=col.name, quoted=False))
-            
-        return expr_copy.sql(identify=False)
+            if isinstance(col.this, Identifier):
+                col.this.set("quoted", False)
+            else:
+                col.set("this", Identifier(this=col.name, quoted=False))
 
+        resolved_sql = expr_copy.sql(identify=False)
+        self._cache_put(self._resolved_sql_cache, key, (expression, resolved_sql))
+        return resolved_sql
 
 if __name__ == '__main__':
     # 测试代码
@@ -1,9 +1,9 @@
 import os
 import sys
+from itertools import islice
 import streamlit as st
 import networkx as nx
 from pathlib import Path
-from streamlit_agraph import agraph, Node, Edge, Config
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent.parent
@@ -14,10 +14,22 @@ from src.utils.dataloder import DataLoader
 from src.utils.sql_parser import SQLParser
 from src.utils.graph_loader import GraphLoader
 
+# 侧边栏问题下拉框最多显示的选项数，避免大数据集每次重跑都向前端发送上千个选项
+MAX_QUESTION_OPTIONS = 50
+# 子图布局坐标的缩放范围 (像素)，spring_layout 的坐标落在 [-LAYOUT_SCALE, LAYOUT_SCALE]
+LAYOUT_SCALE = 250
+# 预计算布局的最大节点数：networkx 的 spring_layout 在 500 个节点及以上改用 scipy 稀疏实现 (scipy 不在依赖中)，
+# 超过该规模时不预计算坐标，退回前端 physics 布局
+LAYOUT_MAX_NODES = 499
+
+def use_precomputed_layout(num_nodes):
+    """子图是否使用预计算的坐标 (否则由前端 physics 计算布局)"""
+    return num_nodes <= LAYOUT_MAX_NODES
+
 # ==========================================
 # 0. 全局配置 streamlit run .\src\utils\sql_vis.py
 # ==========================================
-st.set_page_config(page_title="SQL 可视化分析工具", layout="wide", page_icon="🔍")
+# 页面配置与界面渲染放在 main() 中，作为模块导入 (如复用 extract_subgraph) 时不触发 Streamlit 界面
 
 # 样式定义 (保持与 vis.py 一致)
 STYLE = {
@@ -45,6 +57,41 @@ STYLE = {
     }
 }
 
+# 节点/边的样式字典对同类型完全相同，模块加载时预先构建，渲染时共享引用
+# (streamlit_agraph 只读取这些字典)
+_SHADOW_STYLE = {"enabled": True, "color": "rgba(0,0,0,0.3)", "size": 5, "x": 2, "y": 2}
+_EDGE_ARROWS = {"to": {"enabled": True, "scaleFactor": 0.8}}
+
+def _build_node_style(conf):
+    diameter = conf.get("size", 30)
+    return {
+        "shape": "ellipse",
+        "widthConstraint": {"minimum": diameter, "maximum": diameter},
+        "heightConstraint": {"minimum": diameter, "maximum": diameter},
+        "color": conf.get("color"),
+        "font": {
+            "color": conf.get("font_color"),
+            "size": conf.get("font_size"),
+            "face": "arial"
+        },
+        "borderWidth": 1,
+        "shadow": _SHADOW_STYLE,
+    }
+
+def _build_edge_style(conf):
+    return {
+        "color": conf.get("color"),
+        "width": conf.get("width"),
+        "dashes": conf.get("dashes", False),
+        "arrows": _EDGE_ARROWS,
+    }
+
+_NODE_STYLE_CACHE = {t: _build_node_style(conf) for t, conf in STYLE.items()}
+_EDGE_STYLE_CACHE = {t: _build_edge_style(conf) for t, conf in STYLE.items()}
+_DEFAULT_NODE_STYLE = _build_node_style({})
+_DEFAULT_EDGE_STYLE = _build_edge_style({})
+
+
 def smart_truncate(content, length=8):
     """截断显示的 Label"""
     s = str(content)
@@ -52,9 +99,9 @@ def smart_truncate(content, length=8):
         return s
     return s[:length] + ".."
 
-@st.cache_resource
+@st.cache_resource(max_entries=16)
 def load_graph(dataset_name, db_name):
-    """加载完整图结构"""
+    """加载完整图结构 (按数据集与数据库缓存，最多保留 16 个图；返回共享对象，调用方不应修改)"""
     # 统一处理 dataset_name
     if "spider" in dataset_name.lower():
         dataset_name = "spider"
@@ -67,197 +114,258 @@ def load_graph(dataset_name, db_name):
         return None
     return GraphLoader.load_graph(pkl_path)
 
+@st.cache_resource(max_entries=4)
+def get_data_loader(dataset_name):
+    """获取缓存的数据加载器实例 (每个数据集一个，数据集共 4 个)"""
+    return DataLoader(dataset_name)
+
+@st.cache_data(max_entries=4)
+def get_db_names(dataset_name):
+    """按数据集缓存排序后的数据库 ID 列表"""
+    return get_data_loader(dataset_name).list_dbnames()
+
+@st.cache_data(max_entries=64)
+def get_db_questions(dataset_name, db_name):
+    """
+    按 (数据集, 数据库) 缓存该库的所有问题、侧边栏显示用的标签以及用于筛选的小写问题文本。
+    标签在缓存时一次截断好，重跑时无需重新构建问题列表。
+    """
+    db_data = get_data_loader(dataset_name).filter_data(db_id=db_name, fields=["question", "sql_query", "evidence"])
+    labels = [f"{i}: {item['question']}"[:40] + "..." for i, item in enumerate(db_data)]
+    search_keys = [str(item['question']).lower() for item in db_data]
+    return db_data, labels, search_keys
+
 @st.cache_resource
 def get_sql_parser(dataset_name, db_name):
     """获取缓存的 SQL 解析器实例"""
     return SQLParser(dataset_name, db_name)
 
+@st.cache_data(max_entries=512)
+def get_sql_report(dataset_name, db_name, sql):
+    """按 (数据集, 数据库, SQL) 缓存解析报告，与 SQL 无关的控件变动引起重跑时直接复用"""
+    return get_sql_parser(dataset_name, db_name).generate_report(sql)
+
+@st.cache_data(max_entries=512)
+def get_sql_entities(dataset_name, db_name, sql):
+    """按 (数据集, 数据库, SQL) 缓存解析出的实体 {table_name: [col_name, ...]}"""
+    return get_sql_parser(dataset_name, db_name).extract_entities(sql)
+
 def extract_subgraph(G, entities):
     """
     根据 SQL 解析出的实体提取子图。
     entities: {table_name: [col_name, ...]}
+    没有实体或实体均不在图中时返回 None。
     """
-    if G is None:
+    if G is None or not entities:
         return None
     
-    subgraph_nodes = set()
-    
-    # 1. 添加涉及的表节点和列节点
-    for table, columns in entities.items():
-        # 添加表节点
-        if G.has_node(table):
-            subgraph_nodes.add(table)
-        
-        # 添加列节点
-        for col in columns:
-            # Column node id format: "table.col"
-            col_node_id = f"{table}.{col}"
-            if G.has_node(col_node_id):
-                subgraph_nodes.add(col_node_id)
+    # 1. 收集候选的表节点和列节点 (Column node id format: "table.col")
+    candidates = set(entities)
+    candidates.update(
+        f"{table}.{col}" for table, columns in entities.items() for col in columns
+    )
+    # 与图中已有节点求交集，替代逐个 has_node 查询
+    subgraph_nodes = candidates & G.nodes.keys()
+    if not subgraph_nodes:
+        return None
                 
     # 2. 构建子图
     # 使用 subgraph 方法会保留所有连接这些节点的边
     # 但我们可能只想保留特定的边：
     # - HAS_COLUMN: table -> col (必须都在 subgraph_nodes 里)
     # - FOREIGN_KEY: table -> table (必须都在 subgraph_nodes 里)
-    
-    sub_G = G.subgraph(list(subgraph_nodes)).copy()
+    # convert_nx_to_agraph 只读取子图，直接返回只读视图，无需 copy
+    sub_G = G.subgraph(subgraph_nodes)
     
     return sub_G
 
 def convert_nx_to_agraph(G):
     """将 NetworkX 图转换为 agraph 组件需要的格式"""
+    # 延迟导入：仅在真正渲染时才加载 streamlit_agraph
+    from streamlit_agraph import Node, Edge
+
     nodes = []
     edges = []
     
     if G is None:
         return [], []
 
+    # 预先计算固定布局 (seed 固定，结果可复现)，前端关闭 physics 后无需在浏览器中逐帧模拟力导向布局
+    pos = nx.spring_layout(G, seed=0, scale=LAYOUT_SCALE) if use_precomputed_layout(G.number_of_nodes()) else None
+
     for node_id, attrs in G.nodes(data=True):
         node_type = attrs.get("type", "Unknown")
-        conf = STYLE.get(node_type, {})
+        style = _NODE_STYLE_CACHE.get(node_type, _DEFAULT_NODE_STYLE)
         real_name = attrs.get("name", node_id)
         
         truncate_len = 8 if node_type == "Column" else 10
         label_text = smart_truncate(real_name, truncate_len)
-        diameter = conf.get("size", 30)
 
+        if pos is not None:
+            x, y = pos[node_id]
+            style = {**style, "x": int(x), "y": int(y)}
         nodes.append(Node(
             id=node_id,
             label=label_text,
-            shape="ellipse",
-            widthConstraint={"minimum": diameter, "maximum": diameter},
-            heightConstraint={"minimum": diameter, "maximum": diameter},
-            color=conf.get("color"),
-            font={
-                "color": conf.get("font_color"),
-                "size": conf.get("font_size"),
-                "face": "arial"
-            },
             title=f"Name: {real_name}\nType: {node_type}",
-            borderWidth=1,
-            shadow={"enabled": True, "color": "rgba(0,0,0,0.3)", "size": 5, "x": 2, "y": 2}
+            **style
         ))
 
     for u, v, attrs in G.edges(data=True):
         edge_type = attrs.get("type")
-        conf = STYLE.get(edge_type, {})
+        style = _EDGE_STYLE_CACHE.get(edge_type, _DEFAULT_EDGE_STYLE)
         
         edges.append(Edge(
             source=u,
             target=v,
-            color=conf.get("color"),
-            width=conf.get("width"),
-            dashes=conf.get("dashes", False),
-            arrows={"to": {"enabled": True, "scaleFactor": 0.8}},
-            label=edge_type if edge_type == "FOREIGN_KEY" else "" # 仅外键显示标签
+            label=edge_type if edge_type == "FOREIGN_KEY" else "", # 仅外键显示标签
+            **style
         ))
 
     return nodes, edges
 
+@st.cache_resource(max_entries=512)
+def get_subgraph_elements(dataset_name, db_name, sql):
+    """
+    按 (数据集, 数据库, SQL) 缓存子图的 agraph 节点与边；子图完全由这三者决定，重跑时直接复用。
+    返回共享的 Node/Edge 对象 (agraph 只读取)，图文件不存在时返回 None。
+    """
+    full_graph = load_graph(dataset_name, db_name)
+    if full_graph is None:
+        return None
+    sub_graph = extract_subgraph(full_graph, get_sql_entities(dataset_name, db_name, sql))
+    return convert_nx_to_agraph(sub_graph)
+
+@st.cache_resource
+def get_agraph_config(physics=False):
+    """子图画布配置为常量，按是否启用 physics 各只构建一次"""
+    from streamlit_agraph import Config
+
+    return Config(
+        width=600,
+        height=600,
+        directed=True, 
+        physics=physics,  # 默认关闭，使用 convert_nx_to_agraph 预先计算的布局
+        hierarchical=False,
+        nodeHighlightBehavior=True,
+        highlightColor="#F7A7A6",
+        collapsible=False
+    )
+
 # ==========================================
-# 1. 侧边栏与数据加载
+# 主程序
 # ==========================================
-st.sidebar.title("🗄️ 数据集选择")
+def main():
+    from streamlit_agraph import agraph
 
-dataset_options = ["spider", "spider_dev", "bird", "bird_dev"]
-selected_dataset = st.sidebar.selectbox("选择数据集", dataset_options, index=0)
+    st.set_page_config(page_title="SQL 可视化分析工具", layout="wide", page_icon="🔍")
+
+    # ==========================================
+    # 1. 侧边栏与数据加载
+    # ==========================================
+    st.sidebar.title("🗄️ 数据集选择")
+
+    dataset_options = ["spider", "spider_dev", "bird", "bird_dev"]
+    selected_dataset = st.sidebar.selectbox("选择数据集", dataset_options, index=0)
+
+    # 加载数据：只有读取数据文件的步骤放在 try 中，各阶段分别检查，失败时不影响已缓存的其他阶段
+    try:
+        db_list = get_db_names(selected_dataset)
+    except Exception as e:
+        st.error(f"数据加载失败: {e}")
+        st.stop()
+
+    if not db_list:
+        st.sidebar.warning("当前数据集中没有数据库")
+        st.stop()
 
-# 加载数据
-try:
-    loader = DataLoader(selected_dataset)
-    db_list = loader.list_dbnames()
-    
     selected_db = st.sidebar.selectbox("选择数据库", db_list)
-    
-    # 筛选当前数据库下的所有问题
-    db_data = loader.filter_data(db_id=selected_db, fields=["question", "sql_query", "evidence"])
-    
-    # 构建问题列表供选择
+
+    # 筛选当前数据库下的所有问题，并构建问题列表供选择 (按数据集与数据库缓存)
     # 仅使用最简单的 selectbox，不进行复杂的双向绑定
-    question_options = [f"{i}: {item['question']}" for i, item in enumerate(db_data)]
-    
-    # 格式化函数，用于侧边栏显示
-    def format_func(idx):
-        return question_options[idx][:40] + "..."
+    try:
+        db_data, question_options, search_keys = get_db_questions(selected_dataset, selected_db)
+    except Exception as e:
+        st.error(f"数据加载失败: {e}")
+        st.stop()
+
+    # 按关键字筛选问题，下拉框只显示前 MAX_QUESTION_OPTIONS 个匹配项
+    filter_text = st.sidebar.text_input("筛选问题 (关键字)").strip().lower()
+    if filter_text:
+        matched = (i for i, key in enumerate(search_keys) if filter_text in key)
+    else:
+        matched = iter(range(len(db_data)))
+    option_idxs = list(islice(matched, MAX_QUESTION_OPTIONS))
 
-    # 简单的选择框
+    if not option_idxs:
+        st.sidebar.warning("没有匹配的问题")
+        st.stop()
+
+    # 简单的选择框，侧边栏直接显示预先截断的标签
     selected_q_idx = st.sidebar.selectbox(
         "选择问题", 
-        range(len(db_data)), 
-        format_func=format_func,
+        option_idxs, 
+        format_func=question_options.__getitem__,
         index=0
     )
-    
+
     current_item = db_data[selected_q_idx]
 
-except Exception as e:
-    st.error(f"数据加载失败: {e}")
-    st.stop()
+    # ==========================================
+    # 2. 主界面
+    # ==========================================
+    st.title("SQL 解析与可视化分析")
 
-# ==========================================
-# 2. 主界面
-# ==========================================
-st.title("SQL 解析与可视化分析")
+    col1, col2 = st.columns([1, 1])
 
-col1, col2 = st.columns([1, 1])
+    with col1:
+        st.subheader("📋 数据详情")
+        st.markdown(f"**Question:** {current_item['question']}")
+        st.code(current_item['sql_query'], language="sql")
 
-with col1:
-    st.subheader("📋 数据详情")
-    st.markdown(f"**Question:** {current_item['question']}")
-    st.code(current_item['sql_query'], language="sql")
-    
-    if current_item.get('evidence'):
-        st.info(f"**Evidence:** {current_item['evidence']}")
-    else:
-        st.caption("No evidence provided.")
+        if current_item.get('evidence'):
+            st.info(f"**Evidence:** {current_item['evidence']}")
+        else:
+            st.caption("No evidence provided.")
 
-    st.subheader("📊 SQL 解析报告")
-    
-    # 解析 SQL
-    try:
-        parser = get_sql_parser(selected_dataset, selected_db)
-        
-        # 生成文本报告
-        report = parser.generate_report(current_item['sql_query'])
-        st.text(report)
-        
-        # 获取结构化实体用于提取子图
-        entities = parser.extract_entities(current_item['sql_query'])
-        
-    except Exception as e:
-        st.error(f"解析失败: {e}")
-        entities = {}
+        st.subheader("📊 SQL 解析报告")
 
-with col2:
-    st.subheader("🕸️ 子图可视化")
-    
-    if entities:
-        # 加载完整图
-        full_graph = load_graph(selected_dataset, selected_db)
-        
-        if full_graph:
-            # 提取子图
-            sub_graph = extract_subgraph(full_graph, entities)
-            
-            if sub_graph and sub_graph.number_of_nodes() > 0:
-                nodes, edges = convert_nx_to_agraph(sub_graph)
-                
-                config = Config(
-                    width=600,
-                    height=600,
-                    directed=True, 
-                    physics=True, 
-                    hierarchical=False,
-                    nodeHighlightBehavior=True,
-                    highlightColor="#F7A7A6",
-                    collapsible=False
-                )
-                
-                agraph(nodes=nodes, edges=edges, config=config)
+        # 解析 SQL
+        try:
+            sql_query = current_item['sql_query']
+
+            # 生成文本报告
+            report = get_sql_report(selected_dataset, selected_db, sql_query)
+            st.text(report)
+
+            # 获取结构化实体用于提取子图
+            entities = get_sql_entities(selected_dataset, selected_db, sql_query)
+
+        except Exception as e:
+            st.error(f"解析失败: {e}")
+            entities = {}
+
+    with col2:
+        st.subheader("🕸️ 子图可视化")
+
+        if entities:
+            # 加载完整图并提取子图 (按 SQL 缓存)
+            elements = get_subgraph_elements(selected_dataset, selected_db, current_item['sql_query'])
+
+            if elements is not None:
+                nodes, edges = elements
+
+                if nodes:
+                    # 大子图未预计算坐标，交由前端 physics 布局
+                    physics = not use_precomputed_layout(len(nodes))
+                    agraph(nodes=nodes, edges=edges, config=get_agraph_config(physics))
+                else:
+                    st.warning("提取的子图为空 (可能是解析出的实体在图中未找到)")
             else:
-                st.warning("提取的子图为空 (可能是解析出的实体在图中未找到)")
+                st.warning(f"未找到数据库 {selected_db} 的图结构文件 (.pkl)。请先运行 SchemaPipeline 生成。")
         else:
-            st.warning(f"未找到数据库 {selected_db} 的图结构文件 (.pkl)。请先运行 SchemaPipeline 生成。")
-    else:
-        st.info("等待解析成功后显示子图...")
+            st.info("等待解析成功后显示子图...")
+
+
+if __name__ == "__main__":
+    main()